@@ -1,39 +1,197 @@
-from flask import Flask
+from flask import (
+    Flask,
+    render_template,
+    request,
+    session,
+    flash,
+    g
+)
+from flask_caching import Cache
+from flask_mail import Mail
 from flask_session import Session
 from flask_wtf import CSRFProtect
+from flask_wtf.csrf import CSRFError, generate_csrf
+from werkzeug.utils import import_string
+import click
+import logging
 import os
+import redis
+import threading
+
+from app.models.analytics import Analytics
+from app.services.database import Database
+from app.tasks import celery_init_app
+from app.utils.decorators import get_current_user
+from app.utils.session import StaticRequestFilteringSessionInterface
+from config.config import config
 
 # Initialize extensions
 sess = Session()
 csrf = CSRFProtect()
+cache = Cache()
+mail = Mail()
+
+# Upload directories, created once per process
+UPLOAD_FOLDER = 'static/uploads'
+_UPLOAD_DIRS = (
+    UPLOAD_FOLDER,
+    os.path.join(UPLOAD_FOLDER, 'products'),
+    os.path.join(UPLOAD_FOLDER, 'profiles'),
+    os.path.join(UPLOAD_FOLDER, 'documents')
+)
+_upload_dirs_ensured = False
+
+# Blueprint registry: (import path, url prefix). Controllers are imported
+# by the factory, so importing this module alone stays cheap.
+BLUEPRINTS = (
+    ('app.controllers.auth_controller:auth_bp', '/auth'),
+    ('app.controllers.admin_controller:admin_bp', '/admin'),
+    ('app.controllers.seller_controller:seller_bp', '/seller'),
+    ('app.controllers.user_controller:user_bp', '/user'),
+    ('app.controllers.public_controller:public_bp', '/'),
+    ('app.controllers.cart_controller:cart_bp', '/cart'),
+    ('app.controllers.order_controller:order_bp', '/order'),
+    ('app.controllers.search_controller:search_bp', '/search'),
+    ('app.controllers.review_controller:review_bp', '/review'),
+    ('app.controllers.rider_controller:rider_bp', '/rider'),
+)
+
+# Table bootstrap runs once per process, on the first request
+_tables_created = False
+_tables_lock = threading.Lock()
+_instance_path_ensured = False
+
+def _csrf_token():
+    """Generate the CSRF token once per request and reuse it"""
+    token = getattr(g, '_csrf_token', None)
+    if token is None:
+        token = generate_csrf()
+        g._csrf_token = token
+    return token
+
+class _LazyCsrfToken:
+    """Template value that generates the CSRF token only when rendered"""
+
+    def __str__(self):
+        return _csrf_token()
+
+    __html__ = __str__
+
+_LAZY_CSRF_TOKEN = _LazyCsrfToken()
 
 def create_app(config_name='default'):
-    app = Flask(__name__)
-    
-    # Basic configuration
-    app.config['SECRET_KEY'] = 'dev-secret-key-change-in-production'
-    app.config['SESSION_TYPE'] = 'filesystem'
-    app.config['UPLOAD_FOLDER'] = 'static/uploads'
+    """Application factory function"""
+    # Templates and static files live at the project root, next to the package
+    app = Flask(__name__, template_folder='../templates', static_folder='../static')
     
+    # Ensure the instance folder exists
+    global _instance_path_ensured
+    if not _instance_path_ensured:
+        os.makedirs(app.instance_path, exist_ok=True)
+        _instance_path_ensured = True
+        
+    app.config.from_object(config[config_name])
+    app.config['SESSION_REDIS'] = redis.from_url(app.config['REDIS_URL'])
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+
     # Initialize extensions
     sess.init_app(app)
     csrf.init_app(app)
-    
+    cache.init_app(app)
+    mail.init_app(app)
+    celery_init_app(app)
+    db = Database()
+    db.init_app(app)
+
     # Create upload directories
-    upload_folders = [
-        app.config['UPLOAD_FOLDER'],
-        os.path.join(app.config['UPLOAD_FOLDER'], 'products'),
-        os.path.join(app.config['UPLOAD_FOLDER'], 'profiles'),
-        os.path.join(app.config['UPLOAD_FOLDER'], 'documents')
-    ]
-    
-    for folder in upload_folders:
-        os.makedirs(folder, exist_ok=True)
-    
-    # Register blueprints (only main for now)
-    from app.routes.main import main_bp
-    app.register_blueprint(main_bp)
-    
-    from app.models import user
-    
+    global _upload_dirs_ensured
+    if not _upload_dirs_ensured:
+        for folder in _UPLOAD_DIRS:
+            os.makedirs(folder, exist_ok=True)
+        _upload_dirs_ensured = True
+
+    # Static files don't need a session, a user lookup or the DB bootstrap
+    static_prefix = app.static_url_path + '/'
+    app.session_interface = StaticRequestFilteringSessionInterface(
+        app.session_interface, static_prefix)
+
+    # Register blueprints
+    for import_path, url_prefix in BLUEPRINTS:
+        app.register_blueprint(import_string(import_path), url_prefix=url_prefix)
+
+    @app.errorhandler(CSRFError)
+    def handle_csrf_error(e):
+        # Log key names only; values can be large (uploads) or sensitive
+        if app.logger.isEnabledFor(logging.ERROR):
+            app.logger.error(
+                "CSRF error: %s | method=%s path=%s form_keys=%s cookies=%s session_keys=%s",
+                e.description, request.method, request.path,
+                list(request.form), list(request.cookies), list(session))
+        flash('Your session expired or the form is invalid. Please try again.', 'error')
+        return render_template('errors/403.html'), 403
+
+    @app.cli.command('refresh-analytics')
+    @click.option('--full', is_flag=True, help='Recompute daily sales for all history, not just the last two days.')
+    def refresh_analytics(full):
+        """Rebuild the admin analytics rollup tables (run from cron)"""
+        Analytics.refresh(days=None if full else 2)
+        click.echo('Analytics rollups refreshed.')
+
+    @app.cli.command('migrate')
+    def migrate():
+        """Create missing tables and add the columns newer versions need"""
+        db.create_tables()
+        applied = db.upgrade_schema()
+        for change in applied:
+            click.echo(f'Added {change}')
+        if 'products.order_count_30d' in applied:
+            Analytics.refresh(days=2)
+            click.echo('Filled products.order_count_30d.')
+        click.echo('Database schema is up to date.' if not applied else 'Database schema upgraded.')
+
+    @app.before_request
+    def create_tables():
+        """Create database tables if they don't exist (once per process)"""
+        global _tables_created
+        if _tables_created or request.path.startswith(static_prefix):
+            return
+        with _tables_lock:
+            if not _tables_created:
+                db.create_tables()
+                _tables_created = True
+
+    @app.context_processor
+    def inject_user():
+        """Inject current user into all templates"""
+        return dict(current_user=get_current_user(), csrf_token_value=_LAZY_CSRF_TOKEN)
+
+    # 'index' is kept as an alias of the landing page for url_for('index')
+    # in templates; serving the view directly avoids a redirect hop
+    app.add_url_rule('/', 'index', view_func=app.view_functions['public.landing'])
+
+    # All routes are registered; sort the URL map now rather than on the
+    # first request
+    app.url_map.update()
+
+    # Rendered 404 page for anonymous visitors without pending flashes; the
+    # navbar is the only dynamic part, so that variant never changes
+    error_pages = {}
+
+    def render_error_page(template):
+        """Render an error page, reusing the cached copy when it is static"""
+        if 'user_id' in session or session.get('_flashes'):
+            return render_template(template)
+        page = error_pages.get(template)
+        if page is None:
+            page = error_pages[template] = render_template(template)
+        return page
+
+    @app.errorhandler(404)
+    def not_found(error):
+        return render_error_page('errors/404.html'), 404
+
+    @app.errorhandler(500)
+    def server_error(error):
+        return render_template('errors/500.html'), 500
+
     return app
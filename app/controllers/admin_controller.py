@@ -1,40 +1,67 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+from concurrent.futures import ThreadPoolExecutor
+import traceback
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, current_app
 from app.utils.decorators import login_required, admin_required
+from app.utils.session import revoke_user_sessions
 from app.models.user import User
 from app.models.seller_request import SellerRequest
 from app.models.product import Product
+from app.models.category import Category
 from app.models.order import Order
+from app.models.analytics import Analytics
 from app.services.database import Database
-from app.forms import AdminNotesForm, RejectNotesForm, CategoryForm, SystemSettingsForm
+from app import cache
+from app.forms import CategoryForm, SystemSettingsForm
 
 admin_bp = Blueprint('admin', __name__)
 
-@admin_bp.route('/dashboard')
-@login_required
-@admin_required
-def dashboard():
-    """Admin dashboard with key metrics"""
-    # Get statistics
-    db = Database()
-    
-    stats = {}
-    stats['total_users'] = User.get_users_count()
-    stats['total_sellers'] = User.get_users_count(role='seller')
-    stats['total_customers'] = User.get_users_count(role='user')
-    stats['pending_requests'] = SellerRequest.get_requests_count(status='pending')
-    stats['total_orders'] = Order.count()
-    stats['pending_orders'] = Order.count(status='pending')
+# Values an admin may assign to users
+VALID_STATUSES = frozenset(('active', 'inactive', 'banned'))
+VALID_ROLES = frozenset(('user', 'seller', 'admin'))
+
+# Runs independent dashboard/analytics/report queries concurrently
+_query_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='admin-queries')
+
+def _in_app_context(app, func, *args, **kwargs):
+    """Call func in a fresh app context so the thread gets its own DB connection"""
+    with app.app_context():
+        return func(*args, **kwargs)
+
+def _submit(func, *args, **kwargs):
+    """Run func on the query executor and return its future"""
+    app = current_app._get_current_object()
+    return _query_executor.submit(_in_app_context, app, func, *args, **kwargs)
+
+@admin_bp.after_request
+def invalidate_dashboard_cache(response):
+    """Drop cached dashboard data after any admin change"""
+    if request.method == 'POST':
+        cache.delete_memoized(_get_dashboard_data)
+    return response
+
+@cache.memoize(timeout=60)
+def _get_dashboard_data():
+    """Dashboard counters and recent activity (cached for a minute)"""
+    # The queries are independent, so run them in parallel
+    # Get statistics (one round-trip for all counters)
+    stats_future = _submit(Database().get_dashboard_counts)
     
     # Recent seller requests
-    recent_requests = SellerRequest.get_all_requests(limit=5)
+    recent_requests_future = _submit(SellerRequest.get_all_requests, limit=5)
     
     # Recent users
-    recent_users = User.get_all_users(limit=10)
+    recent_users_future = _submit(User.get_all_users, limit=10)
     
-    return render_template('admin/dashboard.html',
-                         stats=stats,
-                         recent_requests=recent_requests,
-                         recent_users=recent_users)
+    return dict(stats=stats_future.result(),
+                recent_requests=recent_requests_future.result(),
+                recent_users=recent_users_future.result())
+
+@admin_bp.route('/dashboard')
+@login_required
+@admin_required
+def dashboard():
+    """Admin dashboard with key metrics"""
+    return render_template('admin/dashboard.html', **_get_dashboard_data())
 
 @admin_bp.route('/seller-requests')
 @login_required
@@ -53,18 +80,11 @@ def seller_requests():
 @admin_required
 def approve_seller_request(request_id):
     """Approve a seller request"""
-    form = AdminNotesForm(request.form)
-    admin_notes = None
-    if form.validate_on_submit():
-        admin_notes = form.admin_notes.data.strip() if form.admin_notes.data else None
-    else:
-        # Check if CSRF is the only error (for optional notes)
-        if form.errors and len(form.errors) == 1 and 'csrf_token' in form.errors:
-            # CSRF passed, but form not validated - use raw data
-            admin_notes = request.form.get('admin_notes', '').strip() or None
-        else:
-            flash('Invalid form data.', 'error')
-            return redirect(url_for('admin.seller_requests'))
+    # CSRF is already checked by CSRFProtect; the notes are optional
+    admin_notes = request.form.get('admin_notes', '').strip() or None
+    if admin_notes and len(admin_notes) > 1000:
+        flash('Invalid form data.', 'error')
+        return redirect(url_for('admin.seller_requests'))
         
     try:
         success = SellerRequest.approve_request(request_id, admin_notes)
@@ -82,20 +102,11 @@ def approve_seller_request(request_id):
 @admin_required
 def reject_seller_request(request_id):
     """Reject a seller request"""
-    form = RejectNotesForm(request.form)
-    admin_notes = None
-    if form.validate_on_submit():
-        admin_notes = form.admin_notes.data.strip()
-    else:
-        # Check if CSRF is the only error and notes are provided
-        if form.errors and len(form.errors) == 1 and 'csrf_token' in form.errors:
-            admin_notes = request.form.get('admin_notes', '').strip()
-            if not admin_notes:
-                flash('Please provide a reason for rejection.', 'error')
-                return redirect(url_for('admin.seller_requests'))
-        else:
-            flash('Please provide a reason for rejection.', 'error')
-            return redirect(url_for('admin.seller_requests'))
+    # CSRF is already checked by CSRFProtect; a reason is required
+    admin_notes = request.form.get('admin_notes', '').strip()
+    if len(admin_notes) < 3:
+        flash('Please provide a reason for rejection.', 'error')
+        return redirect(url_for('admin.seller_requests'))
         
     try:
         success = SellerRequest.reject_request(request_id, admin_notes)
@@ -115,39 +126,26 @@ def manage_users():
     """Manage users"""
     role_filter = request.args.get('role')
     status_filter = request.args.get('status')
-    page = int(request.args.get('page', 1))
+    before_id = request.args.get('before_id', type=int)
     per_page = 20
-    offset = (page - 1) * per_page
     
+    # Fetch one extra row to know whether there is a next page
     users = User.get_all_users(
         role=role_filter if role_filter != 'all' else None,
         status=status_filter if status_filter != 'all' else None,
-        limit=per_page,
-        offset=offset
+        limit=per_page + 1,
+        before_id=before_id
     )
-    
-    # Get total count for pagination
-    total = User.get_users_count(
-        role=role_filter if role_filter != 'all' else None,
-        status=status_filter if status_filter != 'all' else None
-    )
-    
-    # Calculate pagination
-    total_pages = (total + per_page - 1) // per_page
-    has_prev = page > 1
-    has_next = page < total_pages
+    has_next = len(users) > per_page
+    users = users[:per_page]
     
     return render_template('admin/users.html',
                          users=users,
                          current_role=role_filter,
                          current_status=status_filter,
-                         current_page=page,
-                         total_pages=total_pages,
-                         has_prev=has_prev,
+                         has_prev=before_id is not None,
                          has_next=has_next,
-                         prev_page=page-1 if has_prev else None,
-                         next_page=page+1 if has_next else None,
-                         total_users=total)
+                         next_before_id=users[-1]['id'] if has_next else None)
 
 @admin_bp.route('/users/<int:user_id>/update-status', methods=['POST'])
 @login_required
@@ -162,13 +160,15 @@ def update_user_status(user_id):
         return redirect(url_for('admin.manage_users'))
     
     # Validate status
-    valid_statuses = ['active', 'inactive', 'banned']
-    if new_status not in valid_statuses:
+    if new_status not in VALID_STATUSES:
         flash('Invalid status.', 'error')
         return redirect(url_for('admin.manage_users'))
     
     try:
         User.update_status(user_id, new_status)
+        # Inactive and banned users are logged out right away
+        if new_status != 'active':
+            revoke_user_sessions(user_id)
         flash(f'User status updated to {new_status}.', 'success')
     except Exception as e:
         flash('Failed to update user status.', 'error')
@@ -188,8 +188,7 @@ def update_user_role(user_id):
         return redirect(url_for('admin.manage_users'))
     
     # Validate role
-    valid_roles = ['user', 'seller', 'admin']
-    if new_role not in valid_roles:
+    if new_role not in VALID_ROLES:
         flash('Invalid role.', 'error')
         return redirect(url_for('admin.manage_users'))
     
@@ -213,6 +212,7 @@ def delete_user(user_id):
     
     try:
         User.delete(user_id)
+        revoke_user_sessions(user_id)
         flash('User deleted successfully.', 'success')
     except Exception as e:
         flash('Failed to delete user. User may have associated data.', 'error')
@@ -226,26 +226,30 @@ def manage_products():
     """Manage all products"""
     category_filter = request.args.get('category')
     status_filter = request.args.get('status')
-    page = int(request.args.get('page', 1))
+    before_id = request.args.get('before_id', type=int)
     per_page = 20
-    offset = (page - 1) * per_page
     
+    # Fetch one extra row to know whether there is a next page
     products = Product.list(
         category_id=int(category_filter) if category_filter else None,
         status=status_filter if status_filter != 'all' else None,
-        limit=per_page,
-        offset=offset
+        limit=per_page + 1,
+        before_id=before_id
     )
+    has_next = len(products) > per_page
+    products = products[:per_page]
     
     # Get categories for filter
-    db = Database()
-    categories = db.execute_query("SELECT * FROM categories WHERE is_active = 1", fetch=True)
+    categories = Category.list_active()
     
     return render_template('admin/products.html',
                          products=products,
                          categories=categories,
                          current_category=int(category_filter) if category_filter else None,
-                         current_status=status_filter)
+                         current_status=status_filter,
+                         has_prev=before_id is not None,
+                         has_next=has_next,
+                         next_before_id=products[-1]['id'] if has_next else None)
 
 @admin_bp.route('/orders')
 @login_required
@@ -253,14 +257,15 @@ def manage_products():
 def manage_orders():
     """View all orders"""
     status_filter = request.args.get('status')
-    page = int(request.args.get('page', 1))
+    before_id = request.args.get('before_id', type=int)
     per_page = 20
-    offset = (page - 1) * per_page
     
     # Get orders with seller and user info
     db = Database()
     query = '''
-        SELECT o.*, u.username as customer_username, s.username as seller_username
+        SELECT o.id, o.user_id, o.seller_id, o.total_amount, o.status,
+               o.payment_method, o.created_at,
+               u.username as customer_username, s.username as seller_username
         FROM orders o
         JOIN users u ON o.user_id = u.id
         JOIN users s ON o.seller_id = s.id
@@ -272,59 +277,44 @@ def manage_orders():
         query += " AND o.status = %s"
         params.append(status_filter)
     
-    query += " ORDER BY o.created_at DESC LIMIT %s OFFSET %s"
-    params.extend([per_page, offset])
+    # Keyset pagination: continue below the last id already shown
+    if before_id:
+        query += " AND o.id < %s"
+        params.append(before_id)
+    
+    # Fetch one extra row to know whether there is a next page
+    query += " ORDER BY o.id DESC LIMIT %s"
+    params.append(per_page + 1)
     
     orders = db.execute_query(query, params, fetch=True)
+    has_next = len(orders) > per_page
+    orders = orders[:per_page]
     
     return render_template('admin/orders.html',
                          orders=orders,
-                         current_status=status_filter)
+                         current_status=status_filter,
+                         has_prev=before_id is not None,
+                         has_next=has_next,
+                         next_before_id=orders[-1]['id'] if has_next else None)
 
 @admin_bp.route('/analytics')
 @login_required
 @admin_required
 def analytics():
     """Analytics and reports"""
-    db = Database()
-    
-    # Sales analytics
-    sales_data = db.execute_query("""
-        SELECT DATE(created_at) as date, COUNT(*) as order_count, SUM(total_amount) as total_sales
-        FROM orders 
-        WHERE created_at >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-        GROUP BY DATE(created_at)
-        ORDER BY date DESC
-        LIMIT 30
-    """, fetch=True)
-    
-    # Top selling categories
-    category_sales = db.execute_query("""
-        SELECT c.name, COUNT(oi.id) as items_sold, SUM(oi.price_at_time * oi.quantity) as revenue
-        FROM categories c
-        JOIN products p ON c.id = p.category_id
-        JOIN order_items oi ON p.id = oi.product_id
-        GROUP BY c.id, c.name
-        ORDER BY items_sold DESC
-        LIMIT 10
-    """, fetch=True)
-    
-    # Top sellers
-    top_sellers = db.execute_query("""
-        SELECT u.username, u.first_name, u.last_name, 
-               COUNT(o.id) as total_orders, SUM(o.total_amount) as total_revenue
-        FROM users u
-        JOIN orders o ON u.id = o.seller_id
-        WHERE u.role = 'seller'
-        GROUP BY u.id
-        ORDER BY total_revenue DESC
-        LIMIT 10
-    """, fetch=True)
+    return render_template('admin/analytics.html', **_get_analytics_data())
+
+@cache.memoize(timeout=300)
+def _get_analytics_data():
+    """Sales analytics aggregates (cached for five minutes)"""
+    # Reads the pre-aggregated rollup tables (see Analytics.refresh), in parallel
+    sales_data = _submit(Analytics.daily_sales, days=30)
+    category_sales = _submit(Analytics.category_sales, limit=10)
+    top_sellers = _submit(Analytics.top_sellers, limit=10)
     
-    return render_template('admin/analytics.html',
-                         sales_data=sales_data,
-                         category_sales=category_sales,
-                         top_sellers=top_sellers)
+    return dict(sales_data=sales_data.result(),
+                category_sales=category_sales.result(),
+                top_sellers=top_sellers.result())
 
 @admin_bp.route('/system-settings', methods=['GET', 'POST'])
 @login_required
@@ -355,7 +345,8 @@ def system_settings():
         return redirect(url_for('admin.system_settings'))
     
     # Get categories for management
-    categories = db.execute_query("SELECT * FROM categories ORDER BY name", fetch=True)
+    categories = db.execute_query("SELECT id, name, description, is_active FROM categories ORDER BY name",
+                                  fetch=True)
     
     return render_template('admin/system_settings.html',
                          categories=categories,
@@ -373,53 +364,37 @@ def bulk_actions():
         flash('No items selected.', 'error')
         return redirect(request.referrer or url_for('admin.dashboard'))
     
-    # Convert to integers
+    # Convert to a set of integers (duplicates are dropped)
     try:
-        selected_ids = [int(id) for id in selected_items]
+        selected_ids = set(map(int, selected_items))
     except ValueError:
         flash('Invalid selection.', 'error')
         return redirect(request.referrer or url_for('admin.dashboard'))
     
-    success_count = 0
-    
-    if action == 'activate_users':
-        for user_id in selected_ids:
-            if user_id != session['user_id']:  # Don't affect current admin
-                try:
-                    User.update_status(user_id, 'active')
-                    success_count += 1
-                except:
-                    pass
-        flash(f'{success_count} users activated.', 'success')
-    
-    elif action == 'deactivate_users':
-        for user_id in selected_ids:
-            if user_id != session['user_id']:  # Don't affect current admin
-                try:
-                    User.update_status(user_id, 'inactive')
-                    success_count += 1
-                except:
-                    pass
-        flash(f'{success_count} users deactivated.', 'info')
-    
-    elif action == 'ban_users':
-        for user_id in selected_ids:
-            if user_id != session['user_id']:  # Don't affect current admin
-                try:
-                    User.update_status(user_id, 'banned')
-                    success_count += 1
-                except:
-                    pass
-        flash(f'{success_count} users banned.', 'warning')
-    
-    elif action == 'deactivate_products':
-        for product_id in selected_ids:
-            try:
-                Product.update(product_id, status='inactive')
-                success_count += 1
-            except:
-                pass
-        flash(f'{success_count} products deactivated.', 'info')
+    # The current admin is never affected by user actions
+    user_ids = tuple(selected_ids - {session['user_id']})
+    
+    # One UPDATE per action
+    try:
+        if action == 'activate_users':
+            success_count = User.update_status_bulk(user_ids, 'active')
+            flash(f'{success_count} users activated.', 'success')
+        
+        elif action == 'deactivate_users':
+            success_count = User.update_status_bulk(user_ids, 'inactive')
+            revoke_user_sessions(*user_ids)
+            flash(f'{success_count} users deactivated.', 'info')
+        
+        elif action == 'ban_users':
+            success_count = User.update_status_bulk(user_ids, 'banned')
+            revoke_user_sessions(*user_ids)
+            flash(f'{success_count} users banned.', 'warning')
+        
+        elif action == 'deactivate_products':
+            success_count = Product.update_status_bulk(tuple(selected_ids), 'inactive')
+            flash(f'{success_count} products deactivated.', 'info')
+    except Exception as e:
+        flash('Failed to apply the bulk action.', 'error')
     
     return redirect(request.referrer or url_for('admin.dashboard'))
 
@@ -428,10 +403,16 @@ def bulk_actions():
 @admin_required
 def reports():
     """Detailed reports page"""
+    return render_template('admin/reports.html', **_get_reports_data())
+
+@cache.memoize(timeout=300)
+def _get_reports_data():
+    """Revenue, growth and product reports (cached for five minutes)"""
     db = Database()
     
+    # The four reports are independent, so run them in parallel
     # Revenue by month (last 12 months)
-    monthly_revenue = db.execute_query("""
+    monthly_revenue = _submit(db.execute_query, """
         SELECT DATE_FORMAT(created_at, '%Y-%m') as month, 
                COUNT(*) as orders, 
                SUM(total_amount) as revenue
@@ -443,7 +424,7 @@ def reports():
     """, fetch=True)
     
     # Customer acquisition by month
-    user_growth = db.execute_query("""
+    user_growth = _submit(db.execute_query, """
         SELECT DATE_FORMAT(created_at, '%Y-%m') as month,
                COUNT(*) as new_users
         FROM users 
@@ -453,31 +434,35 @@ def reports():
     """, fetch=True)
     
     # Product performance
-    product_performance = db.execute_query("""
-        SELECT p.name, p.price, 
-               COUNT(oi.id) as times_sold,
-               SUM(oi.quantity) as total_quantity,
-               SUM(oi.quantity * oi.price_at_time) as total_revenue
-        FROM products p
-        LEFT JOIN order_items oi ON p.id = oi.product_id
-        GROUP BY p.id
-        ORDER BY total_revenue DESC
-        LIMIT 20
+    # Rank order_items per product first so only the top 20 products are joined
+    product_performance = _submit(db.execute_query, """
+        SELECT p.name, p.price, s.times_sold, s.total_quantity, s.total_revenue
+        FROM (
+            SELECT product_id,
+                   COUNT(*) as times_sold,
+                   SUM(quantity) as total_quantity,
+                   SUM(quantity * price_at_time) as total_revenue
+            FROM order_items
+            GROUP BY product_id
+            ORDER BY total_revenue DESC
+            LIMIT 20
+        ) s
+        JOIN products p ON p.id = s.product_id
+        ORDER BY s.total_revenue DESC
     """, fetch=True)
     
     # Order status distribution
-    order_status_stats = db.execute_query("""
+    order_status_stats = _submit(db.execute_query, """
         SELECT status, COUNT(*) as count
         FROM orders
         GROUP BY status
         ORDER BY count DESC
     """, fetch=True)
     
-    return render_template('admin/reports.html',
-                         monthly_revenue=monthly_revenue,
-                         user_growth=user_growth,
-                         product_performance=product_performance,
-                         order_status_stats=order_status_stats)
+    return dict(monthly_revenue=monthly_revenue.result(),
+                user_growth=user_growth.result(),
+                product_performance=product_performance.result(),
+                order_status_stats=order_status_stats.result())
 
 @admin_bp.route('/categories/add', methods=['POST'])
 @login_required
@@ -489,10 +474,8 @@ def add_category():
         name = form.name.data.strip()
         description = form.description.data.strip() if form.description.data else None
         
-        db = Database()
         try:
-            db.execute_query("INSERT INTO categories (name, description) VALUES (%s, %s)",
-                            (name, description))
+            Category.create(name, description)
             flash('Category added successfully!', 'success')
         except Exception as e:
             flash('Failed to add category. Name may already exist.', 'error')
@@ -506,16 +489,11 @@ def add_category():
 @admin_required
 def toggle_category(category_id):
     """Toggle category active status"""
-    db = Database()
     try:
-        # Get current status and toggle it
-        current = db.execute_query("SELECT is_active FROM categories WHERE id = %s",
-                                  (category_id,), fetch=True, fetchone=True)
-        if current:
-            new_status = not current['is_active']
-            db.execute_query("UPDATE categories SET is_active = %s WHERE id = %s",
-                           (new_status, category_id))
-            status_text = "activated" if new_status else "deactivated"
+        if Category.toggle_active(category_id):
+            # Primary key lookup, only needed for the message
+            current = Category.get_by_id(category_id)
+            status_text = "activated" if current and current['is_active'] else "deactivated"
             flash(f'Category {status_text} successfully!', 'success')
         else:
             flash('Category not found.', 'error')
@@ -548,6 +526,7 @@ def ban_user():
 
     try:
         User.update_status(user_id, 'banned')
+        revoke_user_sessions(user_id)
         flash('User banned successfully.', 'warning')
     except Exception as e:
         flash('Failed to ban user.', 'error')
@@ -621,71 +600,27 @@ def unban_user():
 def user_details(user_id):
     """Get user details for modal"""
     try:
-        user = User.get_by_id(user_id)
+        # User row plus order/product counts in one round-trip
+        user = User.get_by_id_with_counts(user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
-        # Handle None values
-        first_name = user.first_name or ''
-        last_name = user.last_name or ''
-        avatar_initial = first_name[0].upper() if first_name else (user.username[0].upper() if user.username else '?')
-        full_name = f"{first_name} {last_name}".strip()
-        if not full_name:
-            full_name = user.username
-
-        # Get user orders count
-        db = Database()
-        orders_count_result = db.execute_query("SELECT COUNT(*) as count FROM orders WHERE user_id = %s", (user_id,), fetch=True, fetchone=True)
-        orders_count = orders_count_result['count'] if orders_count_result else 0
-
-        # Get user products if seller
-        products_count = 0
-        if user.role == 'seller':
-            products_count_result = db.execute_query("SELECT COUNT(*) as count FROM products WHERE seller_id = %s", (user_id,), fetch=True, fetchone=True)
-            products_count = products_count_result['count'] if products_count_result else 0
-
-        created_at_str = user.created_at.strftime('%B %d, %Y') if user.created_at else 'Unknown'
-        last_login_str = user.last_login.strftime('%B %d, %Y') if user.last_login else 'Never'
-        status = user.status or 'active'
-        status_class = 'success' if status == 'active' else 'danger' if status == 'banned' else 'secondary'
-
-        html = f"""
-        <div class="row">
-            <div class="col-md-4 text-center">
-                <div class="avatar-circle bg-primary text-white mx-auto mb-3" style="width: 80px; height: 80px; font-size: 2em;">
-                    {avatar_initial}
-                </div>
-                <h5>{full_name}</h5>
-                <p class="text-muted">@{user.username}</p>
-            </div>
-            <div class="col-md-8">
-                <div class="row">
-                    <div class="col-sm-6">
-                        <strong>Email:</strong> {user.email or 'N/A'}
-                    </div>
-                    <div class="col-sm-6">
-                        <strong>Role:</strong> <span class="badge bg-secondary">{user.role.title()}</span>
-                    </div>
-                    <div class="col-sm-6">
-                        <strong>Status:</strong> <span class="badge bg-{status_class}">{status.title()}</span>
-                    </div>
-                    <div class="col-sm-6">
-                        <strong>Joined:</strong> {created_at_str}
-                    </div>
-                    <div class="col-sm-6">
-                        <strong>Last Login:</strong> {last_login_str}
-                    </div>
-                    <div class="col-sm-6">
-                        <strong>Orders:</strong> {orders_count}
-                    </div>
-                    {'<div class="col-sm-6"><strong>Products:</strong> ' + str(products_count) + '</div>' if user.role == 'seller' else ''}
-                </div>
-            </div>
-        </div>
-        """
-
-        return jsonify({'html': html})
+        # Plain data; the users page renders the modal itself
+        first_name = user['first_name'] or ''
+        username = user['username'] or ''
+        full_name = f"{first_name} {user['last_name'] or ''}".strip() or username
+        return jsonify({
+            'username': username,
+            'full_name': full_name,
+            'avatar_initial': (first_name or username or '?')[0].upper(),
+            'email': user['email'],
+            'role': user['role'],
+            'status': user['status'] or 'active',
+            'created_at': user['created_at'].strftime('%B %d, %Y') if user['created_at'] else None,
+            'last_login': user['last_login'].strftime('%B %d, %Y') if user.get('last_login') else None,
+            'orders_count': user['orders_count'],
+            'products_count': user['products_count'] if user['role'] == 'seller' else None
+        })
     except Exception as e:
-        import traceback
         error_msg = f"Server error: {str(e)}\n{traceback.format_exc()}"
         return jsonify({'error': error_msg}), 500
@@ -1,13 +1,19 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
 from app.models.user import User
-from app.utils.decorators import anonymous_required, login_required
+from app.models.password_reset import PasswordReset
+from app.utils.decorators import anonymous_required, login_required, get_current_user
+from app.utils.session import track_user_session, untrack_user_session
 from app.forms import LoginForm, SignupForm, PasswordResetRequestForm, PasswordResetForm, ChangePasswordForm
+from app.tasks.mail_reset_password_task import send_reset_password_mail_task
 import secrets
 import hashlib
-from datetime import datetime, timedelta
 
 auth_bp = Blueprint('auth', __name__)
 
+def _token_fingerprint(token):
+    """Indexable fingerprint of a reset token (what gets stored instead of the token)"""
+    return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 @anonymous_required
 def login():
@@ -25,6 +31,9 @@ def login():
             session['user_id'] = user['id']
             session['user_role'] = user['role']
             session.permanent = True
+            # New session id on login, so an id planted before login cannot be reused
+            current_app.session_interface.regenerate(session)
+            track_user_session(user['id'])
             
             # Redirect based on role
             next_page = request.args.get('next')
@@ -58,11 +67,11 @@ def signup():
         address = form.address.data.strip() if form.address.data else None
         
         # Check if user exists
-        if User.get_by_email(email):
+        if User.email_exists(email):
             flash('An account with this email already exists.', 'error')
             return render_template('auth/signup.html', form=form)
         
-        if User.get_by_username(username):
+        if User.username_exists(username):
             flash('This username is already taken.', 'error')
             return render_template('auth/signup.html', form=form)
         
@@ -87,6 +96,8 @@ def signup():
 
 @auth_bp.route('/logout')
 def logout():
+    if 'user_id' in session:
+        untrack_user_session(session['user_id'])
     session.clear()
     flash('You have been logged out successfully.', 'info')
     return redirect(url_for('public.landing'))
@@ -95,7 +106,7 @@ def logout():
 @login_required
 def profile():
     """User profile management"""
-    user = User.get_by_id(session['user_id'])
+    user = get_current_user()
     if not user:
         flash('User not found.', 'error')
         return redirect(url_for('auth.login'))
@@ -127,7 +138,7 @@ def change_password():
     """Change user password"""
     form = ChangePasswordForm()
     if form.validate_on_submit():
-        user = User.get_by_id(session['user_id'])
+        user = get_current_user()
         if not user:
             flash('User not found.', 'error')
             return redirect(url_for('auth.login'))
@@ -158,20 +169,20 @@ def forgot_password():
         if user:
             # Generate reset token
             token = secrets.token_urlsafe(32)
-            token_hash = hashlib.sha256(token.encode()).hexdigest()
+            token_hash = _token_fingerprint(token)
             
-            # Store token in database (you might want to create a separate table for this)
-            # For now, we'll use a simple approach
-            session[f'reset_token_{user["id"]}'] = {
-                'token_hash': token_hash,
-                'expires': (datetime.now() + timedelta(hours=1)).isoformat()
-            }
+            # Only the hash is stored; the link works from any browser
+            PasswordReset.create(user['id'], token_hash, expires_in_minutes=60)
             
-            # In a real application, you'd send an email here
-            flash(f'Password reset instructions have been sent to {email}. Reset link (for demo): /auth/reset-password/{user["id"]}/{token}', 'info')
-        else:
-            # Don't reveal whether email exists or not
-            flash(f'If an account with {email} exists, password reset instructions have been sent.', 'info')
+            # The email is sent by a Celery worker; only the enqueue happens here
+            reset_url = url_for('auth.reset_password', user_id=user['id'], token=token, _external=True)
+            try:
+                send_reset_password_mail_task.delay(email, reset_url)
+            except Exception:
+                current_app.logger.exception('Could not queue the password reset email')
+        
+        # Don't reveal whether email exists or not
+        flash(f'If an account with {email} exists, password reset instructions have been sent.', 'info')
         
         return redirect(url_for('auth.login'))
     
@@ -181,25 +192,17 @@ def forgot_password():
 @anonymous_required
 def reset_password(user_id, token):
     """Password reset form"""
-    # Verify token
-    session_key = f'reset_token_{user_id}'
-    if session_key not in session:
-        flash('Invalid or expired reset token.', 'error')
-        return redirect(url_for('auth.forgot_password'))
-    
-    token_data = session[session_key]
-    token_hash = hashlib.sha256(token.encode()).hexdigest()
-    
-    if (token_hash != token_data['token_hash'] or 
-        datetime.now() > datetime.fromisoformat(token_data['expires'])):
+    # Verify token (primary key lookup on its hash)
+    token_hash = _token_fingerprint(token)
+    if not PasswordReset.is_valid(user_id, token_hash):
         flash('Invalid or expired reset token.', 'error')
         return redirect(url_for('auth.forgot_password'))
     
     form = PasswordResetForm()
     if form.validate_on_submit():
         if User.update_password(user_id, form.password.data):
-            # Clear the reset token
-            session.pop(session_key, None)
+            # Clear the reset token(s)
+            PasswordReset.delete_for_user(user_id)
             flash('Password reset successfully! Please log in with your new password.', 'success')
             return redirect(url_for('auth.login'))
         else:
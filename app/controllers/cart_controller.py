@@ -12,52 +12,56 @@ cart_bp = Blueprint('cart', __name__)
 def view_cart():
     """Display user's cart"""
     user_id = session['user_id']
-    cart_items = Cart.get_user_cart(user_id)
-    total = Cart.get_total(user_id)
+    cart_items, total = Cart.get_user_cart_with_total(user_id)
     
     return render_template('cart/view.html', cart_items=cart_items, total=total)
 
+def _wants_json():
+    """True for XHR/fetch callers that expect a JSON reply instead of a redirect"""
+    return (request.is_json
+            or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+            or request.accept_mimetypes.best == 'application/json')
+
 @cart_bp.route('/add', methods=['POST'])
 @login_required
 def add_to_cart():
     """Add item to cart"""
+    wants_json = _wants_json()
+    data = request.get_json(silent=True) or request.form
     try:
-        product_id = int(request.form.get('product_id'))
-        quantity = int(request.form.get('quantity', 1))
+        product_id = int(data.get('product_id'))
+        quantity = int(data.get('quantity', 1))
         
         if quantity <= 0:
+            if wants_json:
+                return jsonify({'success': False, 'message': 'Invalid quantity.'}), 400
             flash('Invalid quantity.', 'error')
             return redirect(request.referrer or url_for('public.products'))
         
-        # Check if product exists and has sufficient stock
-        product = Product.get_by_id(product_id)
-        if not product:
-            flash('Product not found.', 'error')
-            return redirect(request.referrer or url_for('public.products'))
-        
-        if product['status'] != 'active':
-            flash('Product is not available.', 'error')
-            return redirect(request.referrer or url_for('public.products'))
+        # Add to cart; the stock/status check happens in the same statement
+        user_id = session['user_id']
+        added = Cart.add_item_if_stock(user_id, product_id, quantity)
         
-        if product['stock_quantity'] < quantity:
-            flash(f'Only {product["stock_quantity"]} items available.', 'error')
-            return redirect(request.referrer or url_for('public.products'))
+        # AJAX callers get a small JSON reply, without flash messages or a redirect
+        if wants_json:
+            return jsonify({'success': added, 'cart_count': Cart.count(user_id)})
         
-        # Add to cart
-        user_id = session['user_id']
-        if Cart.add_item(user_id, product_id, quantity):
+        # Form posts get a message naming the product, or explaining the failure
+        product = Product.get_by_id(product_id)
+        if added:
             flash(f'{product["name"]} added to cart successfully!', 'success')
+        elif not product:
+            flash('Product not found.', 'error')
+        elif product['status'] != 'active':
+            flash('Product is not available.', 'error')
         else:
-            flash('Failed to add item to cart.', 'error')
-        
-        # Check if request is AJAX
-        if request.headers.get('Content-Type') == 'application/json':
-            cart_count = len(Cart.get_user_cart(user_id))
-            return jsonify({'success': True, 'cart_count': cart_count})
+            flash(f'Only {product["stock_quantity"]} items available.', 'error')
         
         return redirect(request.referrer or url_for('public.products'))
         
-    except (ValueError, TypeError) as e:
+    except (ValueError, TypeError):
+        if wants_json:
+            return jsonify({'success': False, 'message': 'Invalid request.'}), 400
         flash('Invalid request.', 'error')
         return redirect(request.referrer or url_for('public.products'))
 
@@ -73,23 +77,21 @@ def update_cart():
             flash('Invalid quantity.', 'error')
             return redirect(url_for('cart.view_cart'))
         
-        # Get cart item to check ownership
+        # Get cart item (and its product's stock) to check ownership
         user_id = session['user_id']
-        cart_items = Cart.get_user_cart(user_id)
-        cart_item = next((item for item in cart_items if item['id'] == cart_id), None)
+        cart_item = Cart.get_item_by_id(cart_id, user_id)
         
         if not cart_item:
             flash('Cart item not found.', 'error')
             return redirect(url_for('cart.view_cart'))
         
         # Check stock availability
-        product = Product.get_by_id(cart_item['product_id'])
-        if product and quantity > 0 and product['stock_quantity'] < quantity:
-            flash(f'Only {product["stock_quantity"]} items available for {product["name"]}.', 'error')
+        if quantity > 0 and cart_item['stock_quantity'] < quantity:
+            flash(f'Only {cart_item["stock_quantity"]} items available for {cart_item["name"]}.', 'error')
             return redirect(url_for('cart.view_cart'))
         
         # Update cart
-        if Cart.update_item(cart_id, quantity):
+        if Cart.update_item(cart_id, quantity, user_id):
             if quantity == 0:
                 flash('Item removed from cart.', 'info')
             else:
@@ -110,19 +112,12 @@ def remove_from_cart():
     try:
         cart_id = int(request.form.get('cart_id'))
         
-        # Get cart item to check ownership
+        # The DELETE is scoped to the user, so it doubles as the ownership check
         user_id = session['user_id']
-        cart_items = Cart.get_user_cart(user_id)
-        cart_item = next((item for item in cart_items if item['id'] == cart_id), None)
-        
-        if not cart_item:
-            flash('Cart item not found.', 'error')
-            return redirect(url_for('cart.view_cart'))
-        
-        if Cart.remove_item_by_id(cart_id):
+        if Cart.remove_item_by_id(cart_id, user_id):
             flash('Item removed from cart successfully!', 'success')
         else:
-            flash('Failed to remove item from cart.', 'error')
+            flash('Cart item not found.', 'error')
         
         return redirect(url_for('cart.view_cart'))
         
@@ -148,15 +143,16 @@ def clear_cart():
 def checkout():
     """Checkout process"""
     user_id = session['user_id']
-    cart_items = Cart.get_user_cart(user_id)
+    cart_items, total = Cart.get_user_cart_with_total(user_id)
     
     if not cart_items:
         flash('Your cart is empty.', 'error')
         return redirect(url_for('cart.view_cart'))
     
-    # Check stock availability for all items
+    # Check stock availability for all items (one query for every product)
+    products = Product.get_by_ids([item['product_id'] for item in cart_items])
     for item in cart_items:
-        product = Product.get_by_id(item['product_id'])
+        product = products.get(item['product_id'])
         if not product or product['status'] != 'active':
             flash(f'Product "{item["name"]}" is no longer available.', 'error')
             return redirect(url_for('cart.view_cart'))
@@ -165,8 +161,6 @@ def checkout():
             flash(f'Insufficient stock for "{item["name"]}". Only {product["stock_quantity"]} available.', 'error')
             return redirect(url_for('cart.view_cart'))
     
-    total = Cart.get_total(user_id)
-    
     if request.method == 'POST':
         shipping_address = request.form.get('shipping_address', '').strip()
         payment_method = request.form.get('payment_method', 'cod')
@@ -196,19 +190,12 @@ def checkout():
 def cart_count():
     """Get cart item count (AJAX endpoint)"""
     user_id = session['user_id']
-    cart_items = Cart.get_user_cart(user_id)
-    return jsonify({'count': len(cart_items)})
+    return jsonify({'count': Cart.get_count_cached(user_id)})
 
 @cart_bp.route('/mini-cart')
 @login_required
 def mini_cart():
     """Get mini cart data for header display"""
     user_id = session['user_id']
-    cart_items = Cart.get_user_cart(user_id)
-    total = Cart.get_total(user_id)
-    
-    return jsonify({
-        'items': cart_items[:5],  # Show only first 5 items
-        'count': len(cart_items),
-        'total': total
-    })
\ No newline at end of file
+    # Only the first 5 items are shown
+    return jsonify(Cart.get_mini_cart(user_id))
\ No newline at end of file
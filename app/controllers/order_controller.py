@@ -1,12 +1,37 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+from app import cache
 from app.models.order import Order
-from app.models.user import User
 from app.models.review import Review
-from app.utils.decorators import login_required
+from app.services.database import Database
+from app.utils.decorators import login_required, get_current_user
 from datetime import datetime, timedelta
 
 order_bp = Blueprint('order', __name__)
 
+# Order status timeline shown by track_order, in fulfilment order
+STATUS_TIMELINE = (
+    {'status': 'pending', 'title': 'Order Placed', 'description': 'Your order has been received'},
+    {'status': 'confirmed', 'title': 'Order Confirmed', 'description': 'Seller has confirmed your order'},
+    {'status': 'preparing', 'title': 'Preparing', 'description': 'Your order is being prepared'},
+    {'status': 'shipped', 'title': 'Shipped', 'description': 'Your order has been dispatched'},
+    {'status': 'on_the_way', 'title': 'Out for Delivery', 'description': 'Your order is on the way'},
+    {'status': 'delivered', 'title': 'Delivered', 'description': 'Order successfully delivered'},
+)
+STATUS_INDEX = {step['status']: i for i, step in enumerate(STATUS_TIMELINE)}
+
+CANCELLED_TIMELINE = (
+    {'status': 'pending', 'title': 'Order Placed', 'description': 'Your order was received', 'completed': True},
+    {'status': 'cancelled', 'title': 'Order Cancelled', 'description': 'Order has been cancelled', 'current': True, 'cancelled': True},
+)
+
+# Bulk action -> (required current status, new status)
+BULK_STATUS_TRANSITIONS = {
+    'confirm': ('pending', 'confirmed'),
+    'prepare': ('confirmed', 'preparing'),
+    'ship': ('preparing', 'shipped'),
+    'out_for_delivery': ('shipped', 'on_the_way'),
+}
+
 @order_bp.route('/<int:order_id>')
 @login_required
 def view_order(order_id):
@@ -17,7 +42,7 @@ def view_order(order_id):
         return redirect(url_for('user.orders'))
     
     user_id = session['user_id']
-    user = User.get_by_id(user_id)
+    user = get_current_user()
     
     # Check if user can view this order
     if user['role'] not in ['admin'] and order['user_id'] != user_id and order['seller_id'] != user_id:
@@ -48,18 +73,11 @@ def cancel_order(order_id):
         return redirect(url_for('order.view_order', order_id=order_id))
     
     try:
-        Order.update_status(order_id, 'cancelled')
-        
-        # Restore stock quantities
-        from app.services.database import Database
-        db = Database()
-        for item in order['items']:
-            db.execute_query(
-                "UPDATE products SET stock_quantity = stock_quantity + %s WHERE id = %s",
-                (item['quantity'], item['product_id'])
-            )
-        
-        flash('Order cancelled successfully. Stock quantities have been restored.', 'success')
+        # Status change and stock restore happen in one transaction
+        if Order.cancel(order_id, order['items']):
+            flash('Order cancelled successfully. Stock quantities have been restored.', 'success')
+        else:
+            flash('This order cannot be cancelled as it is already being processed.', 'error')
     except Exception as e:
         flash('Failed to cancel order.', 'error')
     
@@ -105,38 +123,22 @@ def track_order(order_id):
         return redirect(url_for('user.orders'))
     
     user_id = session['user_id']
-    user = User.get_by_id(user_id)
+    user = get_current_user()
     
     # Check if user can track this order
     if user['role'] not in ['admin'] and order['user_id'] != user_id and order['seller_id'] != user_id:
         flash('Unauthorized to track this order.', 'error')
         return redirect(url_for('user.dashboard'))
     
-    # Order status timeline
-    status_timeline = [
-        {'status': 'pending', 'title': 'Order Placed', 'description': 'Your order has been received'},
-        {'status': 'confirmed', 'title': 'Order Confirmed', 'description': 'Seller has confirmed your order'},
-        {'status': 'preparing', 'title': 'Preparing', 'description': 'Your order is being prepared'},
-        {'status': 'shipped', 'title': 'Shipped', 'description': 'Your order has been dispatched'},
-        {'status': 'on_the_way', 'title': 'Out for Delivery', 'description': 'Your order is on the way'},
-        {'status': 'delivered', 'title': 'Delivered', 'description': 'Order successfully delivered'},
-    ]
-    
-    # Mark completed statuses
-    status_order = ['pending', 'confirmed', 'preparing', 'shipped', 'on_the_way', 'delivered']
-    current_index = status_order.index(order['status']) if order['status'] in status_order else 0
-    
-    for i, status in enumerate(status_timeline):
-        if i <= current_index:
-            status['completed'] = True
-        if status['status'] == order['status']:
-            status['current'] = True
-    
     # Check if order is cancelled
     if order['status'] == 'cancelled':
+        status_timeline = CANCELLED_TIMELINE
+    else:
+        # Mark completed statuses
+        current_index = STATUS_INDEX.get(order['status'], 0)
         status_timeline = [
-            {'status': 'pending', 'title': 'Order Placed', 'description': 'Your order was received', 'completed': True},
-            {'status': 'cancelled', 'title': 'Order Cancelled', 'description': 'Order has been cancelled', 'current': True, 'cancelled': True}
+            {**step, 'completed': i <= current_index, 'current': step['status'] == order['status']}
+            for i, step in enumerate(STATUS_TIMELINE)
         ]
     
     return render_template('order/track.html', order=order, status_timeline=status_timeline)
@@ -163,11 +165,8 @@ def review_products(order_id):
         return redirect(url_for('order.view_order', order_id=order_id))
     
     # Get existing reviews for this order's products
-    existing_reviews = {}
-    for item in order['items']:
-        review = Review.get_by_user_product(user_id, item['product_id'])
-        if review:
-            existing_reviews[item['product_id']] = review
+    existing_reviews = Review.get_by_user_and_products(
+        user_id, [item['product_id'] for item in order['items']])
     
     return render_template('order/review_products.html', 
                          order=order, 
@@ -183,19 +182,20 @@ def submit_reviews(order_id):
         return redirect(url_for('user.orders'))
     
     user_id = session['user_id']
-    success_count = 0
     
+    # Collect the valid ratings in one pass, then save them in one statement
+    rows = []
     for item in order['items']:
         product_id = item['product_id']
-        rating = request.form.get(f'rating_{product_id}')
+        rating = request.form.get(f'rating_{product_id}', type=int)
         comment = request.form.get(f'comment_{product_id}', '').strip()
-        
-        if rating and 1 <= int(rating) <= 5:
-            try:
-                Review.create(user_id, product_id, int(rating), comment if comment else None)
-                success_count += 1
-            except Exception as e:
-                pass  # Continue with other reviews
+        if rating and 1 <= rating <= 5:
+            rows.append((user_id, product_id, rating, comment or None))
+    
+    try:
+        success_count = Review.create_many(rows)
+    except Exception as e:
+        success_count = 0
     
     if success_count > 0:
         flash(f'{success_count} product review(s) submitted successfully!', 'success')
@@ -209,7 +209,7 @@ def submit_reviews(order_id):
 def bulk_order_action():
     """Handle bulk actions on orders (for sellers/admins)"""
     user_id = session['user_id']
-    user = User.get_by_id(user_id)
+    user = get_current_user()
     
     if user['role'] not in ['seller', 'admin']:
         flash('Unauthorized.', 'error')
@@ -225,35 +225,19 @@ def bulk_order_action():
     success_count = 0
     
     try:
-        order_ids = [int(order_id) for order_id in selected_orders]
-        
-        for order_id in order_ids:
-            order = Order.get_by_id(order_id)
-            if not order:
-                continue
-            
-            # Verify authorization
-            if user['role'] == 'seller' and order['seller_id'] != user_id:
-                continue
-            
-            # Apply bulk action
-            if action == 'confirm' and order['status'] == 'pending':
-                Order.update_status(order_id, 'confirmed')
-                success_count += 1
-            elif action == 'prepare' and order['status'] == 'confirmed':
-                Order.update_status(order_id, 'preparing')
-                success_count += 1
-            elif action == 'ship' and order['status'] == 'preparing':
-                Order.update_status(order_id, 'shipped')
-                success_count += 1
-            elif action == 'out_for_delivery' and order['status'] == 'shipped':
-                Order.update_status(order_id, 'on_the_way')
-                success_count += 1
-    
+        order_ids = set(map(int, selected_orders))
     except (ValueError, TypeError):
         flash('Invalid selection.', 'error')
         return redirect(request.referrer)
     
+    # One UPDATE; the WHERE clause skips orders in the wrong status and,
+    # for sellers, orders that are not theirs
+    transition = BULK_STATUS_TRANSITIONS.get(action)
+    if transition:
+        success_count = Order.update_status_bulk(
+            tuple(order_ids), *transition,
+            seller_id=user_id if user['role'] == 'seller' else None)
+    
     if success_count > 0:
         flash(f'{success_count} orders updated successfully.', 'success')
     else:
@@ -265,12 +249,16 @@ def bulk_order_action():
 @login_required 
 def order_analytics():
     """Order analytics (admin only)"""
-    user = User.get_by_id(session['user_id'])
+    user = get_current_user()
     if user['role'] != 'admin':
         flash('Unauthorized.', 'error')
         return redirect(url_for('user.dashboard'))
     
-    from app.services.database import Database
+    return render_template('order/analytics.html', **_get_order_analytics_data())
+
+@cache.memoize(timeout=300)
+def _get_order_analytics_data():
+    """Order analytics aggregates (cached for five minutes)"""
     db = Database()
     
     # Order statistics by status
@@ -309,8 +297,7 @@ def order_analytics():
         ORDER BY month ASC
     """, fetch=True)
     
-    return render_template('order/analytics.html',
-                         status_stats=status_stats,
-                         payment_stats=payment_stats,
-                         processing_time_stats=processing_time_stats,
-                         monthly_trends=monthly_trends)
\ No newline at end of file
+    return dict(status_stats=status_stats,
+                payment_stats=payment_stats,
+                processing_time_stats=processing_time_stats,
+                monthly_trends=monthly_trends)
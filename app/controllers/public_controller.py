@@ -1,11 +1,39 @@
-from flask import Blueprint, render_template, request, session, flash
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
 import secrets
+from app import cache
+from app.models.category import Category
 from app.models.product import Product
-from app.services.database import Database
+from app.tasks.mail_contact_task import send_contact_mail_task
 from config.config import Config
 
 public_bp = Blueprint('public', __name__)
 
+# Anonymous public pages may be reused by browsers/proxies for this long
+PUBLIC_PAGE_MAX_AGE = 60
+
+@public_bp.after_request
+def add_cache_headers(response):
+    """Make anonymous GET pages cacheable and answer repeat requests with 304"""
+    # Only pages that are the same for every anonymous visitor: the request carries no
+    # session cookie at all and nothing was flashed or stored in the session while
+    # rendering, so a shared cache can never keep a page that belongs to a session
+    if (request.method == 'GET' and response.status_code == 200
+            and current_app.config['SESSION_COOKIE_NAME'] not in request.cookies
+            and not session.modified):
+        response.cache_control.public = True
+        response.cache_control.max_age = PUBLIC_PAGE_MAX_AGE
+        response.cache_control.stale_while_revalidate = 300
+        # A cached anonymous page must never be served to a logged-in session
+        response.vary.add('Cookie')
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
+@cache.memoize(timeout=300)
+def _count_active_products(category_id=None):
+    """Active product total for a listing (cached for five minutes, so it may lag slightly)"""
+    return Product.count(category_id=category_id)
+
 @public_bp.route('/')
 def landing():
     """Landing page with featured products"""
@@ -13,8 +41,7 @@ def landing():
     featured_products = Product.list(limit=8, offset=0)
     
     # Get categories
-    db = Database()
-    categories = db.execute_query("SELECT * FROM categories WHERE is_active = 1", fetch=True)
+    categories = Category.list_active()
     
     return render_template('public/landing.html', 
                          featured_products=featured_products,
@@ -23,44 +50,33 @@ def landing():
 @public_bp.route('/products')
 def browse_products():
     """Browse all products with filtering and pagination"""
-    page = int(request.args.get('page', 1))
+    before_id = request.args.get('before_id', type=int)
     category_id = request.args.get('category')
     search = request.args.get('search', '').strip()
     per_page = Config.PRODUCTS_PER_PAGE
-    offset = (page - 1) * per_page
     
-    # Get products
+    # Keyset pagination; fetch one extra row to know whether there is a next page
     products = Product.list(
         category_id=int(category_id) if category_id else None,
         search=search if search else None,
-        limit=per_page,
-        offset=offset
-    )
-    
-    # Get total count for pagination
-    total = Product.count(
-        category_id=int(category_id) if category_id else None,
-        search=search if search else None
+        limit=per_page + 1,
+        before_id=before_id
     )
+    has_next = len(products) > per_page
+    products = products[:per_page]
     
-    # Calculate pagination info
-    total_pages = (total + per_page - 1) // per_page
-    has_prev = page > 1
-    has_next = page < total_pages
+    # Totals are cached for unfiltered/category listings; searches show no exact total
+    total = None if search else _count_active_products(int(category_id) if category_id else None)
     
     # Get categories for filter
-    db = Database()
-    categories = db.execute_query("SELECT * FROM categories WHERE is_active = 1", fetch=True)
+    categories = Category.list_active()
     
     return render_template('public/products.html',
                          products=products,
                          categories=categories,
-                         current_page=page,
-                         total_pages=total_pages,
-                         has_prev=has_prev,
+                         has_prev=before_id is not None,
                          has_next=has_next,
-                         prev_page=page-1 if has_prev else None,
-                         next_page=page+1 if has_next else None,
+                         next_before_id=products[-1]['id'] if has_next else None,
                          category_id=int(category_id) if category_id else None,
                          search=search,
                          total_products=total)
@@ -72,10 +88,11 @@ def product_detail(product_id):
     if not product:
         return render_template('public/404.html'), 404
     
-    # Get reviews for this product
+    # Get reviews for this product (shared by every visitor, so cached); the
+    # product row stays live for an accurate stock figure and carries the rating totals
     from app.models.review import Review
-    reviews = Review.get_for_product(product_id)
-    rating_info = Review.get_product_average_rating(product_id)
+    reviews = Review.get_for_product_page(product_id)
+    rating_info = Review.rating_info(product)
     
     # Check if current user has reviewed this product
     user_review = None
@@ -91,46 +108,34 @@ def product_detail(product_id):
 @public_bp.route('/category/<int:category_id>')
 def category_products(category_id):
     """Products in a specific category"""
-    page = int(request.args.get('page', 1))
+    before_id = request.args.get('before_id', type=int)
     search = request.args.get('search', '').strip()
     per_page = Config.PRODUCTS_PER_PAGE
-    offset = (page - 1) * per_page
     
     # Get category info
-    db = Database()
-    category = db.execute_query("SELECT * FROM categories WHERE id = %s", 
-                               (category_id,), fetch=True, fetchone=True)
+    category = Category.get_by_id(category_id)
     if not category:
         return render_template('public/404.html'), 404
     
-    # Get products in this category
+    # Get products in this category, one extra to know whether there is a next page
     products = Product.list(
         category_id=category_id,
         search=search if search else None,
-        limit=per_page,
-        offset=offset
+        limit=per_page + 1,
+        before_id=before_id
     )
+    has_next = len(products) > per_page
+    products = products[:per_page]
     
-    # Get total count for pagination
-    total = Product.count(
-        category_id=category_id,
-        search=search if search else None
-    )
-    
-    # Calculate pagination info
-    total_pages = (total + per_page - 1) // per_page
-    has_prev = page > 1
-    has_next = page < total_pages
+    # Totals are cached for unfiltered/category listings; searches show no exact total
+    total = None if search else _count_active_products(category_id)
     
     return render_template('public/category_products.html',
                          products=products,
                          category=category,
-                         current_page=page,
-                         total_pages=total_pages,
-                         has_prev=has_prev,
+                         has_prev=before_id is not None,
                          has_next=has_next,
-                         prev_page=page-1 if has_prev else None,
-                         next_page=page+1 if has_next else None,
+                         next_before_id=products[-1]['id'] if has_next else None,
                          search=search,
                          total_products=total)
 
@@ -157,15 +162,25 @@ def contact():
             flash('Please fill in all required fields.', 'error')
             return render_template('contact.html')
         
-        # For now, log the contact info (in production, send email)
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"Contact form submitted: {first_name} {last_name} ({email}) - Subject: {subject} - Message: {message[:100]}...")
+        # Without a contact inbox (mail not configured) the worker could not deliver it
+        if not current_app.config.get('CONTACT_EMAIL'):
+            current_app.logger.error('CONTACT_EMAIL is not set; contact form message not sent')
+            flash('Sorry, we could not send your message right now. Please try again later.', 'error')
+            return render_template('contact.html')
         
-        # If newsletter signup
-        if newsletter:
-            # Add to newsletter list (placeholder)
-            logger.info(f"Newsletter signup: {email}")
+        # The email is sent by a Celery worker; only the enqueue happens here
+        try:
+            send_contact_mail_task.delay({
+                'first_name': first_name,
+                'last_name': last_name,
+                'email': email,
+                'phone': phone,
+                'subject': subject,
+                'message': message,
+                'newsletter': newsletter,
+            })
+        except Exception:
+            current_app.logger.exception('Could not queue the contact form email')
         
         flash('Thank you for your message! We will get back to you within 24 hours.', 'success')
         return redirect(url_for('public.contact'))
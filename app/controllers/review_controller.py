@@ -1,10 +1,12 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+import logging
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, current_app
+from redis.exceptions import RedisError
 from app.models.review import Review
 from app.models.product import Product
-from app.models.user import User
 from app.models.order import Order
-from app.utils.decorators import login_required, admin_required
+from app.utils.decorators import login_required, admin_required, get_current_user
 from app.services.database import Database
+from app import cache
 
 review_bp = Blueprint('review', __name__)
 
@@ -19,23 +21,8 @@ def product_reviews(product_id):
     # Get all reviews for this product
     reviews = Review.get_for_product(product_id)
     
-    # Get rating statistics
-    rating_stats = Review.get_product_average_rating(product_id)
-    
-    # Get rating distribution
-    db = Database()
-    rating_distribution = db.execute_query("""
-        SELECT rating, COUNT(*) as count
-        FROM reviews
-        WHERE product_id = %s
-        GROUP BY rating
-        ORDER BY rating DESC
-    """, (product_id,), fetch=True)
-    
-    # Convert to dictionary for easier template usage
-    rating_counts = {i: 0 for i in range(1, 6)}
-    for item in rating_distribution:
-        rating_counts[item['rating']] = item['count']
+    # Get rating statistics and distribution (one query)
+    rating_stats, rating_counts = Review.get_rating_summary(product_id)
     
     # Check if current user can leave a review
     can_review = False
@@ -44,18 +31,8 @@ def product_reviews(product_id):
     if 'user_id' in session:
         user_id = session['user_id']
         
-        # Check if user has purchased this product
-        has_purchased = db.execute_query("""
-            SELECT COUNT(*) as count
-            FROM orders o
-            JOIN order_items oi ON o.id = oi.order_id
-            WHERE o.user_id = %s AND oi.product_id = %s AND o.status = 'delivered'
-        """, (user_id, product_id), fetch=True, fetchone=True)
-        
-        can_review = has_purchased['count'] > 0
-        
-        # Get existing review by this user
-        user_review = Review.get_by_user_product(user_id, product_id)
+        # Purchase check and the user's existing review, in one round trip
+        can_review, user_review = Review.get_review_eligibility(user_id, product_id)
     
     return render_template('review/product_reviews.html',
                          product=product,
@@ -87,15 +64,7 @@ def add_review():
             return redirect(url_for('public.products'))
         
         # Check if user has purchased this product
-        db = Database()
-        has_purchased = db.execute_query("""
-            SELECT COUNT(*) as count
-            FROM orders o
-            JOIN order_items oi ON o.id = oi.order_id
-            WHERE o.user_id = %s AND oi.product_id = %s AND o.status = 'delivered'
-        """, (user_id, product_id), fetch=True, fetchone=True)
-        
-        if has_purchased['count'] == 0:
+        if not Review.has_purchased(user_id, product_id):
             flash('You can only review products you have purchased and received.', 'error')
             return redirect(request.referrer or url_for('public.product_details', product_id=product_id))
         
@@ -163,7 +132,7 @@ def delete_review(review_id):
         return redirect(request.referrer or url_for('user.dashboard'))
     
     user_id = session['user_id']
-    user = User.get_by_id(user_id)
+    user = get_current_user()
     
     # Check permissions (owner or admin)
     if review['user_id'] != user_id and user['role'] != 'admin':
@@ -208,9 +177,8 @@ def moderate_reviews():
     # Get filter parameters
     status_filter = request.args.get('status', 'all')
     rating_filter = request.args.get('rating', 'all')
-    page = int(request.args.get('page', 1))
+    before_id = request.args.get('before_id', type=int)
     per_page = 20
-    offset = (page - 1) * per_page
     
     db = Database()
     
@@ -237,30 +205,17 @@ def moderate_reviews():
     # For demonstration, we'll assume reviews have a 'status' field for moderation
     # In reality, you might add this field to the reviews table
     
-    query += " ORDER BY r.created_at DESC LIMIT %s OFFSET %s"
-    params.extend([per_page, offset])
+    # Keyset pagination: continue below the last id already shown, fetching
+    # one extra row to know whether there is a next page
+    if before_id:
+        query += " AND r.id < %s"
+        params.append(before_id)
+    query += " ORDER BY r.id DESC LIMIT %s"
+    params.append(per_page + 1)
     
     reviews = db.execute_query(query, params, fetch=True)
-    
-    # Get total count for pagination
-    count_query = "SELECT COUNT(*) as total FROM reviews r WHERE 1=1"
-    count_params = []
-    
-    if rating_filter != 'all':
-        try:
-            rating_val = int(rating_filter)
-            count_query += " AND r.rating = %s"
-            count_params.append(rating_val)
-        except ValueError:
-            pass
-    
-    total_count = db.execute_query(count_query, count_params, fetch=True, fetchone=True)
-    total = total_count['total'] if total_count else 0
-    
-    # Calculate pagination
-    total_pages = (total + per_page - 1) // per_page
-    has_prev = page > 1
-    has_next = page < total_pages
+    has_next = len(reviews) > per_page
+    reviews = reviews[:per_page]
     
     # Get review statistics
     review_stats = db.execute_query("""
@@ -279,13 +234,17 @@ def moderate_reviews():
                          reviews=reviews,
                          review_stats=review_stats,
                          current_rating=rating_filter,
-                         page=page,
-                         total_pages=total_pages,
-                         has_prev=has_prev,
+                         has_prev=before_id is not None,
                          has_next=has_next,
-                         prev_page=page-1 if has_prev else None,
-                         next_page=page+1 if has_next else None,
-                         total_reviews=total)
+                         next_before_id=reviews[-1]['id'] if has_next else None,
+                         total_reviews=_filtered_review_total(review_stats, rating_filter))
+
+def _filtered_review_total(review_stats, rating_filter):
+    """Number of reviews matching the rating filter, read from the overall statistics row"""
+    if not review_stats:
+        return 0
+    star_columns = {'1': 'one_star', '2': 'two_star', '3': 'three_star', '4': 'four_star', '5': 'five_star'}
+    return review_stats[star_columns.get(rating_filter, 'total_reviews')] or 0
 
 @review_bp.route('/bulk-action', methods=['POST'])
 @login_required
@@ -305,13 +264,8 @@ def bulk_review_action():
         review_ids = [int(review_id) for review_id in selected_reviews]
         
         if action == 'delete':
-            for review_id in review_ids:
-                try:
-                    Review.delete(review_id)
-                    success_count += 1
-                except:
-                    pass
-            
+            # One DELETE ... IN (...) instead of a statement per review
+            success_count = Review.delete_many(set(review_ids))
             flash(f'{success_count} reviews deleted.', 'info')
         
         # You can add more bulk actions here like 'hide', 'approve', etc.
@@ -326,6 +280,11 @@ def bulk_review_action():
 @admin_required
 def review_analytics():
     """Review analytics for admin"""
+    return render_template('review/analytics.html', **_get_review_analytics_data())
+
+@cache.memoize(timeout=600)
+def _get_review_analytics_data():
+    """Review analytics aggregates (cached for ten minutes)"""
     db = Database()
     
     # Overall review statistics
@@ -346,25 +305,33 @@ def review_analytics():
         ORDER BY rating DESC
     """, fetch=True)
     
-    # Most reviewed products
+    # Most reviewed products (aggregated from the (product_id, rating) index, then joined)
     most_reviewed = db.execute_query("""
-        SELECT p.name, p.id, COUNT(r.id) as review_count, AVG(r.rating) as avg_rating
-        FROM products p
-        JOIN reviews r ON p.id = r.product_id
-        GROUP BY p.id
-        ORDER BY review_count DESC
-        LIMIT 10
+        SELECT p.name, p.id, r.review_count, r.avg_rating
+        FROM (
+            SELECT product_id, COUNT(*) as review_count, AVG(rating) as avg_rating
+            FROM reviews
+            GROUP BY product_id
+            ORDER BY review_count DESC
+            LIMIT 10
+        ) r
+        JOIN products p ON p.id = r.product_id
+        ORDER BY r.review_count DESC
     """, fetch=True)
     
-    # Top reviewers
+    # Top reviewers (aggregated from the (user_id, rating) index, then joined)
     top_reviewers = db.execute_query("""
         SELECT u.username, u.first_name, u.last_name, 
-               COUNT(r.id) as review_count, AVG(r.rating) as avg_given_rating
-        FROM users u
-        JOIN reviews r ON u.id = r.user_id
-        GROUP BY u.id
-        ORDER BY review_count DESC
-        LIMIT 10
+               r.review_count, r.avg_given_rating
+        FROM (
+            SELECT user_id, COUNT(*) as review_count, AVG(rating) as avg_given_rating
+            FROM reviews
+            GROUP BY user_id
+            ORDER BY review_count DESC
+            LIMIT 10
+        ) r
+        JOIN users u ON u.id = r.user_id
+        ORDER BY r.review_count DESC
     """, fetch=True)
     
     # Review trends (last 12 months)
@@ -378,17 +345,23 @@ def review_analytics():
         ORDER BY month ASC
     """, fetch=True)
     
-    return render_template('review/analytics.html',
-                         overall_stats=overall_stats,
-                         rating_distribution=rating_distribution,
-                         most_reviewed=most_reviewed,
-                         top_reviewers=top_reviewers,
-                         review_trends=review_trends)
+    return dict(overall_stats=overall_stats,
+                rating_distribution=rating_distribution,
+                most_reviewed=most_reviewed,
+                top_reviewers=top_reviewers,
+                review_trends=review_trends)
 
 @review_bp.route('/helpful/<int:review_id>', methods=['POST'])
 @login_required
 def mark_helpful(review_id):
     """Mark a review as helpful (for future enhancement)"""
+    if not _first_review_action('helpful', session['user_id'], review_id):
+        return jsonify({'success': True, 'message': 'Already marked as helpful.'})
+    
+    if not Review.exists(review_id):
+        _forget_review_action('helpful', session['user_id'], review_id)
+        return jsonify({'error': 'Review not found'}), 404
+    
     # This would require a separate table to track helpful votes
     # For now, just return success
     return jsonify({'success': True, 'message': 'Feature coming soon!'})
@@ -402,6 +375,13 @@ def report_review(review_id):
     if not reason:
         return jsonify({'error': 'Reason is required'}), 400
     
+    if not _first_review_action('report', session['user_id'], review_id):
+        return jsonify({'success': True, 'message': 'Review already reported'})
+    
+    if not Review.exists(review_id):
+        _forget_review_action('report', session['user_id'], review_id)
+        return jsonify({'error': 'Review not found'}), 404
+    
     # In a real application, you would store this report in a database
     # For now, we'll just simulate success
     
@@ -416,4 +396,31 @@ def report_review(review_id):
         
         return jsonify({'success': True, 'message': 'Review reported successfully'})
     except Exception as e:
-        return jsonify({'error': 'Failed to submit report'}), 500
\ No newline at end of file
+        # Nothing was recorded, so the user must be able to report again
+        _forget_review_action('report', session['user_id'], review_id)
+        return jsonify({'error': 'Failed to submit report'}), 500
+
+def _first_review_action(action, user_id, review_id):
+    """True the first time a user takes this action on a review in a day (SET NX in Redis)
+
+    Repeats (double clicks, bots) are answered without touching the database.
+    If Redis is unavailable the action is let through. The claim is taken
+    before handling, so concurrent repeats are rejected too; callers undo it
+    with _forget_review_action() when the action is not recorded.
+    """
+    try:
+        redis_client = current_app.config['SESSION_REDIS']
+        return bool(redis_client.set(_review_action_key(action, user_id, review_id), 1, nx=True, ex=86400))
+    except RedisError as e:
+        logging.warning(f"Could not check review {action} dedupe: {e}")
+        return True
+
+def _forget_review_action(action, user_id, review_id):
+    """Release a claim from _first_review_action() after the action failed"""
+    try:
+        current_app.config['SESSION_REDIS'].delete(_review_action_key(action, user_id, review_id))
+    except RedisError as e:
+        logging.warning(f"Could not release review {action} dedupe: {e}")
+
+def _review_action_key(action, user_id, review_id):
+    return f'review:{action}:{user_id}:{review_id}'
@@ -1,9 +1,9 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, current_app
 from functools import wraps
 from app.utils.decorators import login_required
 from app.models.delivery import Delivery
 from app.models.order import Order
-from app.models.user import User
+from app.tasks.mail_delivery_status_task import send_delivery_status_mail_task
 
 rider_bp = Blueprint('rider', __name__)
 
@@ -35,12 +35,11 @@ def update_delivery_status():
     try:
         if Delivery.update_status(delivery_id, status, notes if notes.strip() else None):
             flash('Delivery status updated and customer notified.', 'success')
-            # Fetch for notification
-            delivery = Delivery.get_by_id(delivery_id)
-            if delivery and delivery['order']:
-                customer = User.get_by_id(delivery['order']['user_id'])
-                if customer and customer['email']:
-                    print(f"Notification: Delivery {delivery_id} status changed to '{status}' for customer {customer['email']}")
+            # The customer lookup and email happen on the Celery mail worker
+            try:
+                send_delivery_status_mail_task.delay(int(delivery_id), status)
+            except Exception:
+                current_app.logger.exception('Could not queue the delivery status email')
         else:
             flash('Failed to update delivery status.', 'error')
     except Exception as e:
@@ -51,8 +50,9 @@ def update_delivery_status():
 @login_required
 @rider_required
 def delivery_details(delivery_id):
-    delivery = Delivery.get_by_id(delivery_id)
-    if not delivery or delivery['rider_id'] != session['user_id']:
+    # Cheap ownership check first; the full delivery (order, rider) is only loaded when allowed
+    if not Delivery.belongs_to_rider(delivery_id, session['user_id']):
         return jsonify({'error': 'Delivery not found or unauthorized.'}), 404
+    delivery = Delivery.get_by_id(delivery_id)
     html = render_template('rider/delivery_detail_modal.html', delivery=delivery)
     return jsonify({'html': html})
@@ -1,208 +1,185 @@
-from flask import Blueprint, render_template, request, jsonify
-from app.models.product import Product
+from flask import Blueprint, current_app, render_template, request, jsonify
+from app import cache
+from app.models.category import Category
+from app.models.product import LIST_SORTS, Product, search_condition, search_terms
 from app.models.review import Review
 from app.services.database import Database
-import math
+from app.services.suggest_trie import get_suggestions_json
+from dataclasses import dataclass
+from typing import Optional
+import base64
+import json
 
 search_bp = Blueprint('search', __name__)
 
+# Suggestions and price ranges may be a minute stale in browsers and the cache
+SEARCH_JSON_MAX_AGE = 60
+
+# Sort options: (column or select alias, direction); p.id breaks ties so the order is total
+SEARCH_SORTS = {
+    'relevance': ('relevance_score', 'DESC'),
+    'price_low': ('p.price', 'ASC'),
+    'price_high': ('p.price', 'DESC'),
+    'rating': ('p.avg_rating', 'DESC'),
+    'newest': ('p.created_at', 'DESC'),
+    'name': ('p.name', 'ASC'),
+}
+
+@dataclass
+class SearchFilters:
+    """Search page filters, parsed and validated once from the query string"""
+    query: str = ''
+    category_id: Optional[int] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_rating: Optional[float] = None
+    sort: str = 'relevance'
+
+    @classmethod
+    def from_args(cls, args):
+        # type= conversions give None for missing or malformed values (e.g. category=all)
+        sort = args.get('sort', 'relevance')
+        return cls(query=args.get('q', '').strip(),
+                   category_id=args.get('category', type=int),
+                   min_price=args.get('min_price', type=float),
+                   max_price=args.get('max_price', type=float),
+                   min_rating=args.get('min_rating', type=float),
+                   sort=sort if sort in SEARCH_SORTS else 'relevance')
+
+    def conditions(self):
+        """WHERE fragments and params of the set filters, besides the text search"""
+        filters = [
+            (" AND p.category_id = %s", self.category_id),
+            (" AND p.price >= %s", self.min_price),
+            (" AND p.price <= %s", self.max_price),
+            (" AND p.avg_rating >= %s", self.min_rating),
+        ]
+        set_filters = [(sql, value) for sql, value in filters if value is not None]
+        return ''.join(sql for sql, _ in set_filters), [value for _, value in set_filters]
+
+    def matches_nothing(self):
+        """Whether the filters contradict each other, so that no product can match"""
+        if self.min_price is not None and self.max_price is not None and self.min_price > self.max_price:
+            return True
+        return self.min_rating is not None and self.min_rating > 5
+
+def _encode_cursor(*values):
+    """Opaque pagination token for the last row shown"""
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+def _decode_cursor(token, size):
+    """Values of a pagination token, or None if it is missing or malformed"""
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    # Only plain sort keys and ids; anything else would reach the query as a parameter
+    if not all(isinstance(v, (str, int, float)) and not isinstance(v, bool) for v in values):
+        return None
+    return values
+
 @search_bp.route('/')
 def search_products():
     """Advanced product search with filters"""
-    # Get search parameters
-    query = request.args.get('q', '').strip()
-    category_id = request.args.get('category')
-    min_price = request.args.get('min_price')
-    max_price = request.args.get('max_price')
-    min_rating = request.args.get('min_rating')
-    sort_by = request.args.get('sort', 'relevance')
-    page = int(request.args.get('page', 1))
+    filters = SearchFilters.from_args(request.args)
+    query = filters.query
+    # Keyset pagination: the cursor holds the sort key and id of the last row shown, plus the total
+    cursor = _decode_cursor(request.args.get('cursor'), 3)
     per_page = 20
     
-    # Calculate offset for pagination
-    offset = (page - 1) * per_page
-    
     # Build search query
     db = Database()
     
-    search_query = """
-        SELECT DISTINCT p.*, c.name as category_name, u.username as seller_username,
-               AVG(r.rating) as avg_rating, COUNT(r.id) as review_count,
-               CASE 
-                 WHEN p.name LIKE %s THEN 3
-                 WHEN p.description LIKE %s THEN 2
-                 WHEN c.name LIKE %s THEN 1
-                 ELSE 0
-               END as relevance_score
+    # Text search goes through the FULLTEXT index, whose MATCH score is the relevance
+    # Ratings are read from the avg_rating/review_count columns kept on the products row
+    terms = search_terms(query) if query else None
+    relevance = 'MATCH(p.name, p.description) AGAINST (%s IN BOOLEAN MODE)' if terms else '0'
+    search_query = f"""
+        SELECT p.*, c.name as category_name, u.username as seller_username,
+               {relevance} as relevance_score
+               {'' if cursor else ', COUNT(*) OVER() as total_rows'}
         FROM products p
         JOIN categories c ON p.category_id = c.id
         JOIN users u ON p.seller_id = u.id
-        LEFT JOIN reviews r ON p.id = r.product_id
         WHERE p.status = 'active'
     """
     
-    params = []
+    params = [terms] if terms else []
     
-    # Text search
     if query:
-        like_query = f"%{query}%"
-        params.extend([like_query, like_query, like_query])
+        condition, search_params = search_condition(query)
+        search_query += condition
+        params.extend(search_params)
+    
+    # Category, price and rating filters
+    condition, filter_params = filters.conditions()
+    search_query += condition
+    params.extend(filter_params)
+    
+    # Continue after the cursor; relevance seeks on the MATCH score itself
+    sort_key, direction = SEARCH_SORTS[filters.sort]
+    if cursor:
+        seek_key = sort_key
+        if sort_key == 'relevance_score':
+            seek_key = relevance
+            if terms:
+                params.append(terms)
+        search_query += f" AND ({seek_key}, p.id) {'<' if direction == 'DESC' else '>'} (%s, %s)"
+        params.extend(cursor[:2])
+    
+    # Sorting, then one extra row to know whether there is a next page
+    search_query += f" ORDER BY {sort_key} {direction}, p.id {direction} LIMIT %s"
+    params.append(per_page + 1)
+    
+    # Execute search, unless the filters already rule out every product
+    products = [] if filters.matches_nothing() else db.execute_query(search_query, params, fetch=True)
+    has_next = len(products) > per_page
+    products = products[:per_page]
+    
+    # On the first page the window count is the number of matching products;
+    # later pages carry it in the cursor
+    if cursor:
+        total = cursor[2]
     else:
-        # If no query, set relevance parameters to empty
-        params.extend(['', '', ''])
-        search_query += " AND 1=1"  # Keep the query structure
-    
-    # Category filter
-    if category_id and category_id != 'all':
-        try:
-            cat_id = int(category_id)
-            search_query += " AND p.category_id = %s"
-            params.append(cat_id)
-        except ValueError:
-            pass
-    
-    # Price filters
-    if min_price:
-        try:
-            min_p = float(min_price)
-            search_query += " AND p.price >= %s"
-            params.append(min_p)
-        except ValueError:
-            pass
-    
-    if max_price:
-        try:
-            max_p = float(max_price)
-            search_query += " AND p.price <= %s"
-            params.append(max_p)
-        except ValueError:
-            pass
-    
-    # Group by for aggregation
-    search_query += " GROUP BY p.id"
-    
-    # Rating filter (applied after grouping)
-    if min_rating:
-        try:
-            min_r = float(min_rating)
-            search_query += " HAVING AVG(r.rating) >= %s"
-            params.append(min_r)
-        except ValueError:
-            pass
-    
-    # Sorting
-    if sort_by == 'price_low':
-        search_query += " ORDER BY p.price ASC"
-    elif sort_by == 'price_high':
-        search_query += " ORDER BY p.price DESC"
-    elif sort_by == 'rating':
-        search_query += " ORDER BY avg_rating DESC, review_count DESC"
-    elif sort_by == 'newest':
-        search_query += " ORDER BY p.created_at DESC"
-    elif sort_by == 'name':
-        search_query += " ORDER BY p.name ASC"
-    else:  # relevance (default)
-        search_query += " ORDER BY relevance_score DESC, p.created_at DESC"
-    
-    # Add pagination
-    search_query += " LIMIT %s OFFSET %s"
-    params.extend([per_page, offset])
-    
-    # Execute search
-    products = db.execute_query(search_query, params, fetch=True)
+        total = products[0]['total_rows'] if products else 0
     
-    # Get total count for pagination (without LIMIT)
-    count_query = """
-        SELECT COUNT(DISTINCT p.id) as total
-        FROM products p
-        JOIN categories c ON p.category_id = c.id
-        LEFT JOIN reviews r ON p.id = r.product_id
-        WHERE p.status = 'active'
-    """
-    
-    count_params = []
-    
-    # Apply same filters for count
-    if query:
-        count_query += " AND (p.name LIKE %s OR p.description LIKE %s OR c.name LIKE %s)"
-        like_query = f"%{query}%"
-        count_params.extend([like_query, like_query, like_query])
-    
-    if category_id and category_id != 'all':
-        try:
-            cat_id = int(category_id)
-            count_query += " AND p.category_id = %s"
-            count_params.append(cat_id)
-        except ValueError:
-            pass
-    
-    if min_price:
-        try:
-            min_p = float(min_price)
-            count_query += " AND p.price >= %s"
-            count_params.append(min_p)
-        except ValueError:
-            pass
-    
-    if max_price:
-        try:
-            max_p = float(max_price)
-            count_query += " AND p.price <= %s"
-            count_params.append(max_p)
-        except ValueError:
-            pass
+    next_cursor = None
+    if has_next:
+        last = products[-1]
+        next_cursor = _encode_cursor(last[sort_key.split('.')[-1]], last['id'], total)
     
-    # For rating filter in count query, we need a subquery
-    if min_rating:
-        try:
-            min_r = float(min_rating)
-            count_query = f"""
-                SELECT COUNT(*) as total FROM ({count_query}
-                GROUP BY p.id
-                HAVING AVG(r.rating) >= %s) as filtered_products
-            """
-            count_params.append(min_r)
-        except ValueError:
-            pass
-    
-    total_count = db.execute_query(count_query, count_params, fetch=True, fetchone=True)
-    total = total_count['total'] if total_count else 0
-    
-    # Calculate pagination info
-    total_pages = math.ceil(total / per_page)
-    has_prev = page > 1
-    has_next = page < total_pages
-    
-    # Get categories for filter dropdown
-    categories = db.execute_query(
-        "SELECT * FROM categories WHERE is_active = 1 ORDER BY name",
-        fetch=True
-    )
-    
-    # Get price range for filter
-    price_range = db.execute_query("""
-        SELECT MIN(price) as min_price, MAX(price) as max_price 
-        FROM products WHERE status = 'active'
-    """, fetch=True, fetchone=True)
+    # Filter dropdown and price bounds, both served from the cache
+    categories = Category.list_active()
+    price_range = _get_price_range_data('', None)
     
     return render_template('search/results.html',
                          products=products,
                          categories=categories,
                          query=query,
-                         current_category=int(category_id) if category_id and category_id != 'all' else None,
-                         current_min_price=min_price,
-                         current_max_price=max_price,
-                         current_min_rating=min_rating,
-                         current_sort=sort_by,
-                         page=page,
-                         total_pages=total_pages,
-                         has_prev=has_prev,
+                         current_category=filters.category_id,
+                         current_min_price=filters.min_price,
+                         current_max_price=filters.max_price,
+                         current_min_rating=filters.min_rating,
+                         current_sort=filters.sort,
+                         has_prev=cursor is not None,
                          has_next=has_next,
-                         prev_page=page-1 if has_prev else None,
-                         next_page=page+1 if has_next else None,
+                         next_cursor=next_cursor,
                          total_results=total,
                          price_range=price_range)
 
+def _cacheable(response):
+    """Let browsers reuse a JSON response, answering repeat requests with 304"""
+    # These endpoints depend only on the query string, never on the session
+    response.cache_control.public = True
+    response.cache_control.max_age = SEARCH_JSON_MAX_AGE
+    response.add_etag()
+    response.make_conditional(request)
+    return response
+
 @search_bp.route('/suggestions')
 def search_suggestions():
     """AJAX endpoint for search autocomplete"""
@@ -211,39 +188,12 @@ def search_suggestions():
     if not query or len(query) < 2:
         return jsonify([])
     
-    db = Database()
-    
-    # Get product name suggestions
-    product_suggestions = db.execute_query("""
-        SELECT DISTINCT p.name, p.id, p.image_url, p.price
-        FROM products p
-        WHERE p.status = 'active' AND p.name LIKE %s
-        ORDER BY p.name
-        LIMIT 8
-    """, (f"%{query}%",), fetch=True)
-    
-    # Get category suggestions
-    category_suggestions = db.execute_query("""
-        SELECT DISTINCT c.name, c.id
-        FROM categories c
-        WHERE c.is_active = 1 AND c.name LIKE %s
-        ORDER BY c.name
-        LIMIT 3
-    """, (f"%{query}%",), fetch=True)
-    
-    suggestions = {
-        'products': product_suggestions or [],
-        'categories': category_suggestions or []
-    }
-    
-    return jsonify(suggestions)
+    # Served from the in-process prefix tries, already serialized, without a database round trip
+    return _cacheable(current_app.response_class(get_suggestions_json(query), mimetype='application/json'))
 
-@search_bp.route('/filters/price-range')
-def get_price_range():
-    """AJAX endpoint to get price range for current filters"""
-    category_id = request.args.get('category')
-    query = request.args.get('q', '').strip()
-    
+@cache.memoize(timeout=SEARCH_JSON_MAX_AGE)
+def _get_price_range_data(query, category_id):
+    """Price bounds of the active products matching a search (memoized)"""
     db = Database()
     
     price_query = """
@@ -256,148 +206,119 @@ def get_price_range():
     params = []
     
     if query:
-        price_query += " AND (p.name LIKE %s OR p.description LIKE %s)"
-        like_query = f"%{query}%"
-        params.extend([like_query, like_query])
+        condition, search_params = search_condition(query)
+        price_query += condition
+        params.extend(search_params)
     
-    if category_id and category_id != 'all':
-        try:
-            cat_id = int(category_id)
-            price_query += " AND p.category_id = %s"
-            params.append(cat_id)
-        except ValueError:
-            pass
+    if category_id is not None:
+        price_query += " AND p.category_id = %s"
+        params.append(category_id)
     
     price_range = db.execute_query(price_query, params, fetch=True, fetchone=True)
     
-    return jsonify({
+    return {
         'min_price': float(price_range['min_price']) if price_range['min_price'] else 0,
         'max_price': float(price_range['max_price']) if price_range['max_price'] else 1000
-    })
+    }
+
+@search_bp.route('/filters/price-range')
+def get_price_range():
+    """AJAX endpoint to get price range for current filters"""
+    filters = SearchFilters.from_args(request.args)
+    
+    return _cacheable(jsonify(_get_price_range_data(filters.query, filters.category_id)))
 
 @search_bp.route('/category/<int:category_id>')
 def browse_category(category_id):
     """Browse products by category"""
-    db = Database()
-    
     # Get category info
-    category = db.execute_query(
-        "SELECT * FROM categories WHERE id = %s AND is_active = 1",
-        (category_id,), fetch=True, fetchone=True
-    )
+    category = Category.get_by_id(category_id)
     
-    if not category:
+    if not category or not category['is_active']:
         return render_template('errors/404.html'), 404
     
     # Get sort and pagination parameters
     sort_by = request.args.get('sort', 'newest')
-    page = int(request.args.get('page', 1))
+    if sort_by not in LIST_SORTS:
+        sort_by = 'newest'
+    # Keyset pagination: the cursor holds the sort value and id of the last row shown
+    cursor = _decode_cursor(request.args.get('cursor'), 2)
     per_page = 20
-    offset = (page - 1) * per_page
     
-    # Get products in category
+    # Sorted in SQL; fetch one extra row to know whether there is a next page
     products = Product.list(
         category_id=category_id,
         status='active',
-        limit=per_page,
-        offset=offset
+        limit=per_page + 1,
+        sort=sort_by,
+        after=cursor
     )
-    
-    # Sort products
-    if sort_by == 'price_low':
-        products.sort(key=lambda x: x['price'])
-    elif sort_by == 'price_high':
-        products.sort(key=lambda x: x['price'], reverse=True)
-    elif sort_by == 'name':
-        products.sort(key=lambda x: x['name'])
-    # 'newest' is default from database query
+    has_next = len(products) > per_page
+    products = products[:per_page]
+    next_cursor = None
+    if has_next:
+        last = products[-1]
+        next_cursor = _encode_cursor(last[LIST_SORTS[sort_by][0].split('.')[-1]], last['id'])
     
     # Get total count
     total = Product.count(category_id=category_id, status='active')
     
-    # Calculate pagination
-    total_pages = math.ceil(total / per_page)
-    has_prev = page > 1
-    has_next = page < total_pages
-    
     # Get related categories (same level)
-    related_categories = db.execute_query("""
-        SELECT * FROM categories 
-        WHERE is_active = 1 AND id != %s 
-        ORDER BY name 
-        LIMIT 6
-    """, (category_id,), fetch=True)
+    related_categories = [c for c in Category.list_active() if c['id'] != category_id][:6]
     
     return render_template('search/category.html',
                          category=category,
                          products=products,
                          related_categories=related_categories,
                          current_sort=sort_by,
-                         page=page,
-                         total_pages=total_pages,
-                         has_prev=has_prev,
+                         has_prev=cursor is not None,
                          has_next=has_next,
-                         prev_page=page-1 if has_prev else None,
-                         next_page=page+1 if has_next else None,
+                         next_cursor=next_cursor,
                          total_results=total)
 
 @search_bp.route('/trending')
 def trending_products():
     """Show trending/popular products"""
+    return render_template('search/trending.html', **_get_trending_data())
+
+@cache.memoize(timeout=300)
+def _get_trending_data():
+    """Trending, top rated and newest products (cached for five minutes)"""
     db = Database()
     
-    # Get trending products (most ordered in last 30 days)
-    trending = db.execute_query("""
-        SELECT p.*, c.name as category_name, u.username as seller_username,
-               COUNT(oi.id) as order_count,
-               AVG(r.rating) as avg_rating,
-               COUNT(DISTINCT r.id) as review_count
-        FROM products p
-        JOIN categories c ON p.category_id = c.id
-        JOIN users u ON p.seller_id = u.id
-        LEFT JOIN order_items oi ON p.id = oi.product_id
-        LEFT JOIN orders o ON oi.order_id = o.id
-        LEFT JOIN reviews r ON p.id = r.product_id
-        WHERE p.status = 'active'
-          AND (o.created_at >= DATE_SUB(NOW(), INTERVAL 30 DAY) OR o.id IS NULL)
-        GROUP BY p.id
-        ORDER BY order_count DESC, avg_rating DESC
-        LIMIT 24
-    """, fetch=True)
-    
-    # Get top rated products
-    top_rated = db.execute_query("""
-        SELECT p.*, c.name as category_name, u.username as seller_username,
-               AVG(r.rating) as avg_rating,
-               COUNT(r.id) as review_count
-        FROM products p
-        JOIN categories c ON p.category_id = c.id
-        JOIN users u ON p.seller_id = u.id
-        LEFT JOIN reviews r ON p.id = r.product_id
-        WHERE p.status = 'active'
-        GROUP BY p.id
-        HAVING COUNT(r.id) >= 3 AND AVG(r.rating) >= 4.0
-        ORDER BY avg_rating DESC, review_count DESC
-        LIMIT 12
+    # Trending (most ordered in the last 30 days), top rated and newest products in one
+    # statement; the CTE is materialized once and each branch is tagged with its bucket.
+    # Order counts and ratings are the stats kept on the products row.
+    rows = db.execute_query("""
+        WITH ranked AS (
+            SELECT p.*, c.name as category_name, u.username as seller_username,
+                   p.order_count_30d as order_count
+            FROM products p
+            JOIN categories c ON p.category_id = c.id
+            JOIN users u ON p.seller_id = u.id
+            WHERE p.status = 'active'
+        )
+        (SELECT 'trending' as bucket, ranked.* FROM ranked
+         ORDER BY order_count DESC, avg_rating DESC
+         LIMIT 24)
+        UNION ALL
+        (SELECT 'top_rated' as bucket, ranked.* FROM ranked
+         WHERE review_count >= 3 AND avg_rating >= 4.0
+         ORDER BY avg_rating DESC, review_count DESC
+         LIMIT 12)
+        UNION ALL
+        (SELECT 'newest' as bucket, ranked.* FROM ranked
+         WHERE created_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
+         ORDER BY created_at DESC
+         LIMIT 12)
     """, fetch=True)
     
-    # Get newest products
-    newest = db.execute_query("""
-        SELECT p.*, c.name as category_name, u.username as seller_username,
-               AVG(r.rating) as avg_rating,
-               COUNT(r.id) as review_count
-        FROM products p
-        JOIN categories c ON p.category_id = c.id
-        JOIN users u ON p.seller_id = u.id
-        LEFT JOIN reviews r ON p.id = r.product_id
-        WHERE p.status = 'active'
-          AND p.created_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-        GROUP BY p.id
-        ORDER BY p.created_at DESC
-        LIMIT 12
-    """, fetch=True)
+    buckets = {'trending': [], 'top_rated': [], 'newest': []}
+    for row in rows:
+        buckets[row['bucket']].append(row)
     
-    return render_template('search/trending.html',
-                         trending_products=trending,
-                         top_rated_products=top_rated,
-                         newest_products=newest)
\ No newline at end of file
+    return {
+        'trending_products': buckets['trending'],
+        'top_rated_products': buckets['top_rated'],
+        'newest_products': buckets['newest']
+    }
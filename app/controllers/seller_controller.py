@@ -1,7 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
-from app.utils.decorators import login_required, seller_required
+from app.utils.decorators import login_required, seller_required, get_current_user
 from app.models.user import User
 from app.models.product import Product
+from app.models.category import Category
 from app.models.order import Order
 from app.models.seller_request import SellerRequest
 from app.services.database import Database
@@ -84,8 +85,7 @@ def dashboard():
 def products():
     seller_id = session['user_id']
     products = Product.list(seller_id=seller_id, status=None)
-    db = Database()
-    categories = db.execute_query("SELECT * FROM categories WHERE is_active = 1", fetch=True)
+    categories = Category.list_active()
     return render_template('seller/products.html', products=products, categories=categories)
 
 @seller_bp.route('/products/add', methods=['POST'])
@@ -95,8 +95,7 @@ def add_product():
     seller_id = session['user_id']
     
     # Get categories to populate form choices
-    db = Database()
-    categories = db.execute_query("SELECT id, name FROM categories WHERE is_active = 1", fetch=True)
+    categories = Category.list_active()
     
     form = SellerProductForm()
     form.category_id.choices = [(cat['id'], cat['name']) for cat in categories]
@@ -131,8 +130,7 @@ def edit_product(product_id):
         return redirect(url_for('seller.products'))
     
     # Get categories to populate form choices
-    db = Database()
-    categories = db.execute_query("SELECT id, name FROM categories WHERE is_active = 1", fetch=True)
+    categories = Category.list_active()
     
     form = SellerProductForm()
     form.category_id.choices = [(cat['id'], cat['name']) for cat in categories]
@@ -313,7 +311,7 @@ def order_details(order_id):
 @login_required
 def apply():
     """Apply to become a seller"""
-    user = User.get_by_id(session['user_id'])
+    user = get_current_user()
     
     # Check if user is already a seller
     if user['role'] == 'seller':
@@ -1,10 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, g
 from app.models.user import User
 from app.models.cart import Cart
 from app.models.order import Order
 from app.models.seller_request import SellerRequest
 from app.models.review import Review
-from app.utils.decorators import login_required
+from app.utils.decorators import login_required, get_current_user
 from app.forms import BecomeSellerForm, CheckoutForm, ReviewForm, CartUpdateForm, CartAddForm, ProfileUpdateForm, ChangePasswordForm
 from werkzeug.utils import secure_filename
 import os
@@ -16,7 +16,7 @@ user_bp = Blueprint('user', __name__)
 @login_required
 def dashboard():
     """User dashboard"""
-    user = User.get_by_id(session['user_id'])
+    user = get_current_user()
     if user['role'] != 'user':
         return redirect(url_for('public.landing'))
     
@@ -24,8 +24,7 @@ def dashboard():
     recent_orders = Order.list_for_user(user['id'], limit=5)
     
     # Get cart items count
-    cart_items = Cart.get_user_cart(user['id'])
-    cart_count = len(cart_items)
+    cart_count = Cart.count(user['id'])
     
     return render_template('user/dashboard.html',
                          user=user,
@@ -37,8 +36,7 @@ def dashboard():
 def view_cart():
     """View shopping cart"""
     user_id = session['user_id']
-    cart_items = Cart.get_user_cart(user_id)
-    total = Cart.get_total(user_id)
+    cart_items, total = Cart.get_user_cart_with_total(user_id)
     
     return render_template('user/cart.html',
                          cart_items=cart_items,
@@ -74,7 +72,7 @@ def update_cart():
         quantity = form.quantity.data
         
         try:
-            Cart.update_item(cart_id, quantity)
+            Cart.update_item(cart_id, quantity, session['user_id'])
             if quantity > 0:
                 flash('Cart updated!', 'success')
             else:
@@ -91,7 +89,7 @@ def update_cart():
 def remove_from_cart(cart_id):
     """Remove item from cart"""
     try:
-        Cart.remove_item_by_id(cart_id)
+        Cart.remove_item_by_id(cart_id, session['user_id'])
         flash('Item removed from cart!', 'info')
     except Exception as e:
         flash('Failed to remove item.', 'error')
@@ -103,10 +101,10 @@ def remove_from_cart(cart_id):
 def checkout():
     """Checkout process"""
     user_id = session['user_id']
-    user = User.get_by_id(user_id)
+    user = get_current_user()
     
     # Check if cart is empty
-    cart_items = Cart.get_user_cart(user_id)
+    cart_items, total = Cart.get_user_cart_with_total(user_id)
     if not cart_items:
         flash('Your cart is empty.', 'warning')
         return redirect(url_for('user.view_cart'))
@@ -130,7 +128,6 @@ def checkout():
     elif request.method == 'POST':
         flash('Please correct the errors in the form.', 'error')
     
-    total = Cart.get_total(user_id)
     return render_template('user/checkout.html',
                          cart_items=cart_items,
                          user=user,
@@ -191,7 +188,7 @@ def add_review():
 def become_seller():
     """Apply to become a seller"""
     user_id = session['user_id']
-    user = User.get_by_id(user_id)
+    user = get_current_user()
     
     # Check if user is already a seller or admin
     if user['role'] != 'user':
@@ -246,7 +243,7 @@ def seller_request_status():
 def settings():
     """User account settings"""
     user_id = session['user_id']
-    user = User.get_by_id(user_id)
+    user = get_current_user()
     
     profile_form = ProfileUpdateForm()
     password_form = ChangePasswordForm()
@@ -288,7 +285,7 @@ def settings():
                       address=profile_form.address.data,
                       profile_image=profile_image_path)
             flash('Profile updated successfully!', 'success')
-            user = User.get_by_id(user_id)  # Refresh user data
+            user = g.current_user = User.get_by_id(user_id)  # Refresh user data
         except Exception as e:
             flash('Failed to update profile.', 'error')
     
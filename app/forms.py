@@ -56,12 +56,6 @@ class SellerProductForm(FlaskForm):
 class OrderStatusForm(FlaskForm):
     status = SelectField('Status', choices=[('pending','Pending'),('confirmed','Confirmed'),('preparing','Preparing'),('shipped','Shipped'),('on_the_way','On the way'),('delivered','Delivered'),('cancelled','Cancelled')], validators=[DataRequired()])
 
-class AdminNotesForm(FlaskForm):
-    admin_notes = TextAreaField('Admin Notes', validators=[Optional(), Length(max=1000)])
-
-class RejectNotesForm(FlaskForm):
-    admin_notes = TextAreaField('Admin Notes', validators=[DataRequired(), Length(min=3)])
-
 class CategoryForm(FlaskForm):
     name = StringField('Name', validators=[DataRequired(), Length(min=2, max=100)])
     description = TextAreaField('Description', validators=[Optional(), Length(max=500)])
@@ -0,0 +1,115 @@
+from app.services.database import Database
+
+class Analytics:
+    """Pre-aggregated sales figures for the admin analytics page
+
+    The analytics_* rollup tables (and products.order_count_30d) are rebuilt
+    by refresh(), which is run periodically with `flask refresh-analytics`
+    (e.g. from cron), so the admin page reads small summary tables instead
+    of aggregating orders.
+    """
+
+    @classmethod
+    def refresh(cls, days=2):
+        """Rebuild the rollup tables; daily sales are recomputed for the last `days` days (all if None)"""
+        db = Database()
+
+        daily_query = '''
+            INSERT INTO analytics_daily_sales (sale_date, order_count, total_sales)
+            SELECT DATE(created_at), COUNT(*), SUM(total_amount)
+            FROM orders
+        '''
+        params = []
+        if days is not None:
+            daily_query += " WHERE created_at >= CURDATE() - INTERVAL %s DAY"
+            params.append(days)
+        daily_query += '''
+            GROUP BY DATE(created_at)
+            ON DUPLICATE KEY UPDATE order_count = VALUES(order_count),
+                                    total_sales = VALUES(total_sales)
+        '''
+        db.execute_query(daily_query, params)
+
+        # Category and seller totals are all-time, so they are rebuilt in full. The old
+        # rows are deleted first (categories and sellers can disappear) in the same
+        # transaction, so the admin page never reads a half-built table.
+        with db.transaction():
+            db.execute_query("DELETE FROM analytics_category_sales")
+            db.execute_query('''
+                INSERT INTO analytics_category_sales (category_id, name, items_sold, revenue)
+                SELECT c.id, c.name, COUNT(oi.id), SUM(oi.price_at_time * oi.quantity)
+                FROM categories c
+                JOIN products p ON c.id = p.category_id
+                JOIN order_items oi ON p.id = oi.product_id
+                GROUP BY c.id, c.name
+            ''')
+            db.execute_query("DELETE FROM analytics_seller_totals")
+            db.execute_query('''
+                INSERT INTO analytics_seller_totals (seller_id, total_orders, total_revenue)
+                SELECT seller_id, COUNT(*), SUM(total_amount)
+                FROM orders
+                GROUP BY seller_id
+            ''')
+
+        # Per-product order counts for the trending page and search suggestions;
+        # updated_at is kept so this does not look like a product edit. The recent
+        # orders are read first, as a range of the created_at index, and their items
+        # through (order_id, product_id), so older orders are never touched. Only
+        # changed counts are written, so unchanged rows are neither locked nor logged.
+        db.execute_query('''
+            UPDATE products p
+            LEFT JOIN (
+                SELECT oi.product_id, COUNT(*) AS order_count
+                FROM orders o
+                STRAIGHT_JOIN order_items oi ON oi.order_id = o.id
+                WHERE o.created_at >= NOW() - INTERVAL 30 DAY
+                GROUP BY oi.product_id
+            ) recent ON recent.product_id = p.id
+            SET p.order_count_30d = COALESCE(recent.order_count, 0),
+                p.updated_at = p.updated_at
+            WHERE p.order_count_30d <> COALESCE(recent.order_count, 0)
+        ''')
+
+    @classmethod
+    def daily_sales(cls, days=30):
+        """Orders and sales per day, newest first; today is computed live"""
+        db = Database()
+        query = '''
+            SELECT sale_date AS date, order_count, total_sales
+            FROM analytics_daily_sales
+            WHERE sale_date >= CURDATE() - INTERVAL %s DAY AND sale_date < CURDATE()
+            UNION ALL
+            SELECT DATE(created_at) AS date, COUNT(*) AS order_count, SUM(total_amount) AS total_sales
+            FROM orders
+            WHERE created_at >= CURDATE()
+            GROUP BY DATE(created_at)
+            ORDER BY date DESC
+            LIMIT %s
+        '''
+        return db.execute_query(query, (days, days), fetch=True)
+
+    @classmethod
+    def category_sales(cls, limit=10):
+        """Best selling categories by items sold"""
+        db = Database()
+        query = '''
+            SELECT name, items_sold, revenue
+            FROM analytics_category_sales
+            ORDER BY items_sold DESC
+            LIMIT %s
+        '''
+        return db.execute_query(query, (limit,), fetch=True)
+
+    @classmethod
+    def top_sellers(cls, limit=10):
+        """Sellers with the highest revenue"""
+        db = Database()
+        query = '''
+            SELECT u.username, u.first_name, u.last_name, t.total_orders, t.total_revenue
+            FROM analytics_seller_totals t
+            JOIN users u ON u.id = t.seller_id
+            WHERE u.role = 'seller'
+            ORDER BY t.total_revenue DESC
+            LIMIT %s
+        '''
+        return db.execute_query(query, (limit,), fetch=True)
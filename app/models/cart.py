@@ -1,8 +1,16 @@
+from app import cache
 from app.services.database import Database
 
+# Header badge / mini cart payloads are cached per user and dropped on every cart write
+CART_CACHE_TIMEOUT = 300
+
 class Cart:
     """Cart model to manage user's cart items"""
 
+    @staticmethod
+    def _invalidate(user_id):
+        cache.delete_many(f'cart:count:{user_id}', f'cart:mini:{user_id}')
+
     @classmethod
     def add_item(cls, user_id, product_id, quantity=1):
         db = Database()
@@ -12,18 +20,36 @@ class Cart:
             new_qty = existing['quantity'] + quantity
             query = "UPDATE cart SET quantity = %s WHERE id = %s"
             db.execute_query(query, (new_qty, existing['id']))
-            return True
-        query = "INSERT INTO cart (user_id, product_id, quantity) VALUES (%s, %s, %s)"
-        db.execute_query(query, (user_id, product_id, quantity))
+        else:
+            query = "INSERT INTO cart (user_id, product_id, quantity) VALUES (%s, %s, %s)"
+            db.execute_query(query, (user_id, product_id, quantity))
+        cls._invalidate(user_id)
         return True
 
     @classmethod
-    def update_item(cls, cart_id, quantity):
+    def add_item_if_stock(cls, user_id, product_id, quantity):
+        """Add to the cart only if the product is active and has the stock, in one statement"""
+        db = Database()
+        # The checks live in the SELECT, so there is no window between check and insert
+        query = '''
+            INSERT INTO cart (user_id, product_id, quantity)
+            SELECT %s, id, %s FROM products
+            WHERE id = %s AND status = 'active' AND stock_quantity >= %s
+            ON DUPLICATE KEY UPDATE quantity = cart.quantity + VALUES(quantity)
+        '''
+        added = db.execute_query(query, (user_id, quantity, product_id, quantity), rowcount=True) > 0
+        if added:
+            cls._invalidate(user_id)
+        return added
+
+    @classmethod
+    def update_item(cls, cart_id, quantity, user_id):
         db = Database()
         if quantity <= 0:
-            return cls.remove_item_by_id(cart_id)
-        query = "UPDATE cart SET quantity = %s WHERE id = %s"
-        db.execute_query(query, (quantity, cart_id))
+            return cls.remove_item_by_id(cart_id, user_id)
+        query = "UPDATE cart SET quantity = %s WHERE id = %s AND user_id = %s"
+        db.execute_query(query, (quantity, cart_id, user_id))
+        cls._invalidate(user_id)
         return True
 
     @classmethod
@@ -31,20 +57,23 @@ class Cart:
         db = Database()
         query = "DELETE FROM cart WHERE user_id = %s AND product_id = %s"
         db.execute_query(query, (user_id, product_id))
+        cls._invalidate(user_id)
         return True
 
     @classmethod
-    def remove_item_by_id(cls, cart_id):
+    def remove_item_by_id(cls, cart_id, user_id):
         db = Database()
-        query = "DELETE FROM cart WHERE id = %s"
-        db.execute_query(query, (cart_id,))
-        return True
+        query = "DELETE FROM cart WHERE id = %s AND user_id = %s"
+        removed = db.execute_query(query, (cart_id, user_id), rowcount=True) > 0
+        cls._invalidate(user_id)
+        return removed
 
     @classmethod
     def clear_cart(cls, user_id):
         db = Database()
         query = "DELETE FROM cart WHERE user_id = %s"
         db.execute_query(query, (user_id,))
+        cls._invalidate(user_id)
         return True
 
     @classmethod
@@ -53,6 +82,18 @@ class Cart:
         query = "SELECT * FROM cart WHERE user_id = %s AND product_id = %s"
         return db.execute_query(query, (user_id, product_id), fetch=True, fetchone=True)
 
+    @classmethod
+    def get_item_by_id(cls, cart_id, user_id):
+        """A single cart row of the user, with the product's name and stock"""
+        db = Database()
+        query = '''
+            SELECT c.*, p.name, p.stock_quantity
+            FROM cart c
+            JOIN products p ON c.product_id = p.id
+            WHERE c.id = %s AND c.user_id = %s
+        '''
+        return db.execute_query(query, (cart_id, user_id), fetch=True, fetchone=True)
+
     @classmethod
     def get_user_cart(cls, user_id):
         db = Database()
@@ -65,8 +106,45 @@ class Cart:
         return db.execute_query(query, (user_id,), fetch=True)
 
     @classmethod
-    def get_total(cls, user_id):
+    def get_user_cart_with_total(cls, user_id):
+        """Cart items and their total from a single query"""
         items = cls.get_user_cart(user_id)
+        return items, cls._sum_total(items)
+
+    @classmethod
+    def get_total(cls, user_id):
+        return cls._sum_total(cls.get_user_cart(user_id))
+
+    @classmethod
+    def count(cls, user_id):
+        """Number of items in the user's cart, without fetching them"""
+        db = Database()
+        query = "SELECT COUNT(*) AS count FROM cart WHERE user_id = %s"
+        return db.execute_query(query, (user_id,), fetch=True, fetchone=True)['count']
+
+    @classmethod
+    def get_count_cached(cls, user_id):
+        """Cart item count for the header badge, served from the cache when possible"""
+        key = f'cart:count:{user_id}'
+        count = cache.get(key)
+        if count is None:
+            count = cls.count(user_id)
+            cache.set(key, count, timeout=CART_CACHE_TIMEOUT)
+        return count
+
+    @classmethod
+    def get_mini_cart(cls, user_id):
+        """First five items, count and total for the header mini cart (cached)"""
+        key = f'cart:mini:{user_id}'
+        mini = cache.get(key)
+        if mini is None:
+            items, total = cls.get_user_cart_with_total(user_id)
+            mini = {'items': items[:5], 'count': len(items), 'total': total}
+            cache.set(key, mini, timeout=CART_CACHE_TIMEOUT)
+        return mini
+
+    @staticmethod
+    def _sum_total(items):
         total = 0.0
         for item in items:
             total += float(item['price']) * item['quantity']
@@ -0,0 +1,58 @@
+from app import cache
+from app.services.database import Database
+from app.services.suggest_trie import invalidate_suggestions
+
+# Categories rarely change; the cached copies are dropped on every admin edit
+CATEGORY_CACHE_TIMEOUT = 300
+
+class Category:
+    """Category model for the product categories"""
+
+    @staticmethod
+    def _invalidate(category_id=None):
+        keys = ['categories:active']
+        if category_id is not None:
+            keys.append(f'category:{category_id}')
+        cache.delete_many(*keys)
+        invalidate_suggestions()
+
+    @classmethod
+    def create(cls, name, description=None):
+        db = Database()
+        query = "INSERT INTO categories (name, description) VALUES (%s, %s)"
+        category_id = db.execute_query(query, (name, description))
+        cls._invalidate()
+        return category_id
+
+    @classmethod
+    def toggle_active(cls, category_id):
+        """Flip is_active in one atomic statement; returns False if there is no such category"""
+        db = Database()
+        query = "UPDATE categories SET is_active = NOT is_active WHERE id = %s"
+        affected = db.execute_query(query, (category_id,), rowcount=True)
+        cls._invalidate(category_id)
+        return affected > 0
+
+    @classmethod
+    def get_by_id(cls, category_id):
+        """Category row, served from the cache when possible"""
+        key = f'category:{category_id}'
+        category = cache.get(key)
+        if category is None:
+            db = Database()
+            query = "SELECT * FROM categories WHERE id = %s"
+            category = db.execute_query(query, (category_id,), fetch=True, fetchone=True)
+            if category is not None:
+                cache.set(key, category, timeout=CATEGORY_CACHE_TIMEOUT)
+        return category
+
+    @classmethod
+    def list_active(cls):
+        """Active categories by name, served from the cache when possible"""
+        categories = cache.get('categories:active')
+        if categories is None:
+            db = Database()
+            query = "SELECT * FROM categories WHERE is_active = 1 ORDER BY name"
+            categories = db.execute_query(query, fetch=True)
+            cache.set('categories:active', categories, timeout=CATEGORY_CACHE_TIMEOUT)
+        return categories
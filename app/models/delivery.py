@@ -59,6 +59,34 @@ class Delivery:
                 result['rider'] = rider
         return result
 
+    @staticmethod
+    def belongs_to_rider(delivery_id, rider_id):
+        """Whether the delivery is assigned to the rider, without loading it"""
+        db = Database()
+        return db.execute_query(
+            "SELECT 1 AS found FROM deliveries WHERE id = %s AND rider_id = %s",
+            (delivery_id, rider_id),
+            fetch=True,
+            fetchone=True
+        ) is not None
+
+    @staticmethod
+    def get_customer_contact(delivery_id):
+        """Order id and the customer's name/email for a delivery, in one query"""
+        db = Database()
+        return db.execute_query(
+            '''
+            SELECT o.id AS order_id, u.email, u.first_name
+            FROM deliveries d
+            JOIN orders o ON o.id = d.order_id
+            JOIN users u ON u.id = o.user_id
+            WHERE d.id = %s
+            ''',
+            (delivery_id,),
+            fetch=True,
+            fetchone=True
+        )
+
     @staticmethod
     def get_by_order_id(order_id):
         """Get delivery by order ID to check if assigned"""
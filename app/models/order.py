@@ -114,6 +114,49 @@ class Order:
         db.execute_query("UPDATE orders SET status = %s WHERE id = %s", (status, order_id))
         return True
 
+    @classmethod
+    def update_status_bulk(cls, order_ids, from_status, to_status, seller_id=None):
+        """Move the given orders that are in from_status to to_status; returns the number changed"""
+        if not order_ids:
+            return 0
+        db = Database()
+        placeholders = ', '.join(['%s'] * len(order_ids))
+        query = f"UPDATE orders SET status = %s WHERE id IN ({placeholders}) AND status = %s"
+        params = [to_status, *order_ids, from_status]
+        if seller_id is not None:
+            query += " AND seller_id = %s"
+            params.append(seller_id)
+        return db.execute_query(query, params, rowcount=True)
+
+    @classmethod
+    def cancel(cls, order_id, items):
+        """Cancel a pending/confirmed order and restock its items in one transaction"""
+        db = Database()
+        with db.transaction():
+            # The status check makes a second (concurrent) cancel a no-op
+            cancelled = db.execute_query(
+                "UPDATE orders SET status = 'cancelled' WHERE id = %s AND status IN ('pending', 'confirmed')",
+                (order_id,),
+                rowcount=True,
+            )
+            if not cancelled:
+                return False
+            restock = {}
+            for i in items:
+                restock[i['product_id']] = restock.get(i['product_id'], 0) + i['quantity']
+            if restock:
+                # One UPDATE for every product: CASE picks each row's quantity
+                cases = ' '.join(['WHEN %s THEN stock_quantity + %s'] * len(restock))
+                placeholders = ', '.join(['%s'] * len(restock))
+                params = [v for item in restock.items() for v in item]
+                params += list(restock)
+                db.execute_query(
+                    f"UPDATE products SET stock_quantity = CASE id {cases} ELSE stock_quantity END "
+                    f"WHERE id IN ({placeholders})",
+                    params,
+                )
+        return True
+
     @classmethod
     def update_payment_status(cls, order_id, payment_status):
         db = Database()
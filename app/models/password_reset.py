@@ -0,0 +1,31 @@
+from app.services.database import Database
+
+class PasswordReset:
+    """Password reset tokens; only the SHA-256 hash of a token is stored"""
+
+    @classmethod
+    def create(cls, user_id, token_hash, expires_in_minutes=60):
+        """Store a reset token, replacing any earlier one for the user"""
+        db = Database()
+        db.execute_query("DELETE FROM password_resets WHERE user_id = %s", (user_id,))
+        query = '''
+            INSERT INTO password_resets (token_hash, user_id, expires_at)
+            VALUES (%s, %s, NOW() + INTERVAL %s MINUTE)
+        '''
+        db.execute_query(query, (token_hash, user_id, expires_in_minutes))
+
+    @classmethod
+    def is_valid(cls, user_id, token_hash):
+        """Whether the token belongs to the user and has not expired"""
+        db = Database()
+        query = '''
+            SELECT 1 FROM password_resets
+            WHERE token_hash = %s AND user_id = %s AND expires_at > NOW()
+        '''
+        return db.execute_query(query, (token_hash, user_id), fetch=True, fetchone=True) is not None
+
+    @classmethod
+    def delete_for_user(cls, user_id):
+        """Invalidate every reset token of a user"""
+        db = Database()
+        db.execute_query("DELETE FROM password_resets WHERE user_id = %s", (user_id,))
@@ -1,4 +1,29 @@
+import re
 from app.services.database import Database
+from app.services.suggest_trie import invalidate_suggestions
+
+def search_terms(search):
+    """Boolean mode FULLTEXT query for a product text search, or None if it has no words"""
+    # Every word must match as a prefix, through the FULLTEXT index on (name, description);
+    # the truncation operator also keeps short words and stopwords in the query
+    words = re.findall(r'\w+', search)
+    return ' '.join(f'+{word}*' for word in words) if words else None
+
+def search_condition(search):
+    """SQL condition and params for a product text search"""
+    terms = search_terms(search)
+    if terms:
+        return " AND MATCH(p.name, p.description) AGAINST (%s IN BOOLEAN MODE)", [terms]
+    like = f"%{search}%"
+    return " AND (p.name LIKE %s OR p.description LIKE %s)", [like, like]
+
+# Listing orders: (column, direction); p.id breaks ties so keyset pages are stable
+LIST_SORTS = {
+    'newest': ('p.id', 'DESC'),
+    'price_low': ('p.price', 'ASC'),
+    'price_high': ('p.price', 'DESC'),
+    'name': ('p.name', 'ASC'),
+}
 
 class Product:
     """Product model for product operations"""
@@ -11,6 +36,7 @@ class Product:
             VALUES (%s, %s, %s, %s, %s, %s, %s)
         '''
         product_id = db.execute_query(query, (seller_id, category_id, name, description, price, stock_quantity, image_url))
+        invalidate_suggestions()
         return cls.get_by_id(product_id)
     
     @classmethod
@@ -25,6 +51,17 @@ class Product:
         '''
         return db.execute_query(query, (product_id,), fetch=True, fetchone=True)
     
+    @classmethod
+    def get_by_ids(cls, product_ids):
+        """Get several products in one query, as a dict keyed by id"""
+        if not product_ids:
+            return {}
+        db = Database()
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        query = f"SELECT * FROM products WHERE id IN ({placeholders})"
+        rows = db.execute_query(query, tuple(product_ids), fetch=True)
+        return {row['id']: row for row in rows}
+    
     @classmethod
     def update(cls, product_id, **kwargs):
         db = Database()
@@ -40,17 +77,34 @@ class Product:
         values.append(product_id)
         query = f"UPDATE products SET {', '.join(fields)} WHERE id = %s"
         db.execute_query(query, values)
+        # Stock and description changes do not show in search suggestions
+        if kwargs.keys() & {'name', 'price', 'image_url', 'status'}:
+            invalidate_suggestions()
         return True
     
+    @classmethod
+    def update_status_bulk(cls, product_ids, status):
+        """Update the status of several products at once; returns the number changed"""
+        if not product_ids:
+            return 0
+        db = Database()
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        query = f"UPDATE products SET status = %s WHERE id IN ({placeholders})"
+        updated = db.execute_query(query, [status, *product_ids], rowcount=True)
+        invalidate_suggestions()
+        return updated
+    
     @classmethod
     def delete(cls, product_id):
         db = Database()
         query = "DELETE FROM products WHERE id = %s"
         db.execute_query(query, (product_id,))
+        invalidate_suggestions()
         return True
     
     @classmethod
-    def list(cls, category_id=None, search=None, seller_id=None, status='active', limit=None, offset=0):
+    def list(cls, category_id=None, search=None, seller_id=None, status='active', limit=None, offset=0,
+             before_id=None, sort='newest', after=None):
         db = Database()
         query = '''
             SELECT p.*, c.name as category_name, u.username as seller_username
@@ -70,10 +124,21 @@ class Product:
             query += " AND p.seller_id = %s"
             params.append(seller_id)
         if search:
-            query += " AND (p.name LIKE %s OR p.description LIKE %s)"
-            like = f"%{search}%"
-            params.extend([like, like])
-        query += " ORDER BY p.created_at DESC"
+            condition, search_params = search_condition(search)
+            query += condition
+            params.extend(search_params)
+        # Keyset pagination: continue below the last id already shown
+        if before_id:
+            query += " AND p.id < %s"
+            params.append(before_id)
+        # or, for the other orders, past the (sort value, id) of the last row shown
+        column, direction = LIST_SORTS.get(sort, LIST_SORTS['newest'])
+        if after:
+            query += f" AND ({column}, p.id) {'<' if direction == 'DESC' else '>'} (%s, %s)"
+            params.extend(after)
+        query += f" ORDER BY {column} {direction}"
+        if column != 'p.id':
+            query += f", p.id {direction}"
         if limit:
             query += " LIMIT %s OFFSET %s"
             params.extend([limit, offset])
@@ -94,9 +159,9 @@ class Product:
             query += " AND p.seller_id = %s"
             params.append(seller_id)
         if search:
-            query += " AND (p.name LIKE %s OR p.description LIKE %s)"
-            like = f"%{search}%"
-            params.extend([like, like])
+            condition, search_params = search_condition(search)
+            query += condition
+            params.extend(search_params)
         result = db.execute_query(query, params, fetch=True, fetchone=True)
         return result['count'] if result else 0
 
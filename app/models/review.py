@@ -1,7 +1,33 @@
+from app import cache
 from app.services.database import Database
 
+# A product's reviews are cached for its detail page and dropped on every review write
+REVIEWS_CACHE_TIMEOUT = 120
+
 class Review:
-    """Review model for product feedback"""
+    """Review model for product feedback
+
+    products.review_count and products.rating_sum are kept in step with every
+    write here, in the same transaction, so ratings are read from the product
+    row instead of being aggregated per page view.
+    """
+
+    @staticmethod
+    def _invalidate(*product_ids):
+        if product_ids:
+            cache.delete_many(*(f'reviews:product:{product_id}' for product_id in product_ids))
+
+    @staticmethod
+    def _adjust_product_ratings(db, deltas):
+        """Apply {product_id: (review_count_delta, rating_sum_delta)} to the products' stored totals"""
+        rows = [(count, total, product_id) for product_id, (count, total) in deltas.items() if count or total]
+        if rows:
+            # updated_at is left alone: a review is not an edit of the product
+            db.execute_many(
+                "UPDATE products SET review_count = review_count + %s, rating_sum = rating_sum + %s, "
+                "updated_at = updated_at WHERE id = %s",
+                rows,
+            )
 
     @classmethod
     def create(cls, user_id, product_id, rating, comment=None):
@@ -11,9 +37,45 @@ class Review:
         if existing:
             return cls.update(existing['id'], rating, comment)
         query = "INSERT INTO reviews (user_id, product_id, rating, comment) VALUES (%s, %s, %s, %s)"
-        review_id = db.execute_query(query, (user_id, product_id, rating, comment))
+        with db.transaction():
+            review_id = db.execute_query(query, (user_id, product_id, rating, comment))
+            cls._adjust_product_ratings(db, {product_id: (1, rating)})
+        cls._invalidate(product_id)
         return cls.get_by_id(review_id)
 
+    @classmethod
+    def create_many(cls, rows):
+        """Save (user_id, product_id, rating, comment) rows in one statement; existing reviews are updated"""
+        if not rows:
+            return 0
+        db = Database()
+        query = '''
+            INSERT INTO reviews (user_id, product_id, rating, comment) VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE rating = VALUES(rating), comment = VALUES(comment)
+        '''
+        pairs = ', '.join(['(%s, %s)'] * len(rows))
+        with db.transaction():
+            # Ratings about to be replaced, locked so the stored totals stay exact
+            existing = db.execute_query(
+                f"SELECT user_id, product_id, rating FROM reviews WHERE (user_id, product_id) IN ({pairs}) FOR UPDATE",
+                [value for row in rows for value in row[:2]],
+                fetch=True,
+            )
+            current = {(r['user_id'], r['product_id']): r['rating'] for r in existing}
+            db.execute_many(query, rows)
+            deltas = {}
+            for user_id, product_id, rating, _ in rows:
+                count, total = deltas.get(product_id, (0, 0))
+                previous = current.get((user_id, product_id))
+                if previous is None:
+                    deltas[product_id] = (count + 1, total + rating)
+                else:
+                    deltas[product_id] = (count, total + rating - previous)
+                current[(user_id, product_id)] = rating
+            cls._adjust_product_ratings(db, deltas)
+        cls._invalidate(*deltas)
+        return len(rows)
+
     @classmethod
     def get_by_id(cls, review_id):
         db = Database()
@@ -25,12 +87,64 @@ class Review:
         """
         return db.execute_query(query, (review_id,), fetch=True, fetchone=True)
 
+    @classmethod
+    def exists(cls, review_id):
+        """Whether a review with this id exists (primary key lookup)"""
+        db = Database()
+        query = "SELECT 1 FROM reviews WHERE id = %s"
+        return db.execute_query(query, (review_id,), fetch=True, fetchone=True) is not None
+    
     @classmethod
     def get_by_user_product(cls, user_id, product_id):
         db = Database()
         query = "SELECT * FROM reviews WHERE user_id = %s AND product_id = %s"
         return db.execute_query(query, (user_id, product_id), fetch=True, fetchone=True)
 
+    @classmethod
+    def has_purchased(cls, user_id, product_id):
+        """Whether the user has a delivered order containing the product"""
+        db = Database()
+        # EXISTS stops at the first matching order instead of counting them all
+        query = '''
+            SELECT EXISTS(
+                SELECT 1
+                FROM orders o
+                JOIN order_items oi ON o.id = oi.order_id
+                WHERE o.user_id = %s AND o.status = 'delivered' AND oi.product_id = %s
+            ) AS has_purchased
+        '''
+        return bool(db.execute_query(query, (user_id, product_id), fetch=True, fetchone=True)['has_purchased'])
+
+    @classmethod
+    def get_review_eligibility(cls, user_id, product_id):
+        """(has_purchased, the user's existing review or None) from a single query"""
+        db = Database()
+        # The one-row derived table keeps a row even when there is no review to join
+        query = '''
+            SELECT EXISTS(
+                SELECT 1
+                FROM orders o
+                JOIN order_items oi ON o.id = oi.order_id
+                WHERE o.user_id = %s AND o.status = 'delivered' AND oi.product_id = %s
+            ) AS has_purchased, r.*
+            FROM (SELECT 1) AS one
+            LEFT JOIN reviews r ON r.user_id = %s AND r.product_id = %s
+        '''
+        row = db.execute_query(query, (user_id, product_id, user_id, product_id), fetch=True, fetchone=True)
+        has_purchased = bool(row.pop('has_purchased'))
+        return has_purchased, (row if row['id'] is not None else None)
+
+    @classmethod
+    def get_by_user_and_products(cls, user_id, product_ids):
+        """The user's reviews of several products in one query, keyed by product_id"""
+        if not product_ids:
+            return {}
+        db = Database()
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        query = f"SELECT * FROM reviews WHERE user_id = %s AND product_id IN ({placeholders})"
+        rows = db.execute_query(query, (user_id, *product_ids), fetch=True)
+        return {row['product_id']: row for row in rows}
+
     @classmethod
     def get_for_product(cls, product_id):
         db = Database()
@@ -47,21 +161,90 @@ class Review:
     def update(cls, review_id, rating, comment=None):
         db = Database()
         query = "UPDATE reviews SET rating = %s, comment = %s WHERE id = %s"
-        db.execute_query(query, (rating, comment, review_id))
+        with db.transaction():
+            current = db.execute_query("SELECT product_id, rating FROM reviews WHERE id = %s FOR UPDATE",
+                                       (review_id,), fetch=True, fetchone=True)
+            if current is None:
+                return None
+            db.execute_query(query, (rating, comment, review_id))
+            cls._adjust_product_ratings(db, {current['product_id']: (0, rating - current['rating'])})
+        cls._invalidate(current['product_id'])
         return cls.get_by_id(review_id)
 
     @classmethod
     def delete(cls, review_id):
         db = Database()
         query = "DELETE FROM reviews WHERE id = %s"
-        db.execute_query(query, (review_id,))
+        with db.transaction():
+            review = db.execute_query("SELECT product_id, rating FROM reviews WHERE id = %s FOR UPDATE",
+                                      (review_id,), fetch=True, fetchone=True)
+            if review is None:
+                return True
+            db.execute_query(query, (review_id,))
+            cls._adjust_product_ratings(db, {review['product_id']: (-1, -review['rating'])})
+        cls._invalidate(review['product_id'])
         return True
 
+    @classmethod
+    def delete_many(cls, review_ids):
+        """Delete several reviews in one statement; returns the number deleted"""
+        if not review_ids:
+            return 0
+        db = Database()
+        placeholders = ', '.join(['%s'] * len(review_ids))
+        query = f"DELETE FROM reviews WHERE id IN ({placeholders})"
+        with db.transaction():
+            products = db.execute_query(
+                f"SELECT product_id, COUNT(*) AS review_count, SUM(rating) AS rating_sum "
+                f"FROM reviews WHERE id IN ({placeholders}) GROUP BY product_id FOR UPDATE",
+                list(review_ids),
+                fetch=True,
+            )
+            deleted = db.execute_query(query, list(review_ids), rowcount=True)
+            cls._adjust_product_ratings(db, {row['product_id']: (-row['review_count'], -int(row['rating_sum']))
+                                             for row in products})
+        cls._invalidate(*(row['product_id'] for row in products))
+        return deleted
+
+    @classmethod
+    def get_for_product_page(cls, product_id):
+        """Reviews for a product's detail page, served from the cache when possible"""
+        key = f'reviews:product:{product_id}'
+        reviews = cache.get(key)
+        if reviews is None:
+            reviews = cls.get_for_product(product_id)
+            cache.set(key, reviews, timeout=REVIEWS_CACHE_TIMEOUT)
+        return reviews
+
+    @staticmethod
+    def rating_info(product):
+        """Average rating and review count from a product row's stored totals"""
+        count = product.get('review_count') or 0
+        if count:
+            return {'average': round(product['rating_sum'] / count, 1), 'count': count}
+        return {'average': 0, 'count': 0}
+
     @classmethod
     def get_product_average_rating(cls, product_id):
         db = Database()
-        query = "SELECT AVG(rating) as avg_rating, COUNT(*) as count FROM reviews WHERE product_id = %s"
+        query = "SELECT review_count, rating_sum FROM products WHERE id = %s"
         result = db.execute_query(query, (product_id,), fetch=True, fetchone=True)
-        if result and result['avg_rating']:
-            return {'average': round(float(result['avg_rating']), 1), 'count': result['count']}
-        return {'average': 0, 'count': 0}
+        return cls.rating_info(result) if result else {'average': 0, 'count': 0}
+
+    @classmethod
+    def get_rating_summary(cls, product_id):
+        """Average rating and per-star counts, as a single row from SQL"""
+        db = Database()
+        query = '''
+            SELECT COUNT(*) as count, AVG(rating) as avg_rating,
+                   SUM(rating = 1) as r1, SUM(rating = 2) as r2, SUM(rating = 3) as r3,
+                   SUM(rating = 4) as r4, SUM(rating = 5) as r5
+            FROM reviews
+            WHERE product_id = %s
+        '''
+        row = db.execute_query(query, (product_id,), fetch=True, fetchone=True)
+        # SUM() over no rows is NULL
+        rating_counts = {i: int(row[f'r{i}'] or 0) for i in range(1, 6)}
+        if row['count']:
+            return {'average': round(float(row['avg_rating']), 1), 'count': row['count']}, rating_counts
+        return {'average': 0, 'count': 0}, rating_counts
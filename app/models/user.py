@@ -1,5 +1,30 @@
 from app.services.database import Database
-from werkzeug.security import generate_password_hash, check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from werkzeug.security import check_password_hash
+
+try:
+    from gevent import get_hub, monkey
+except ImportError:  # gevent is only needed by the production server (wsgi.py)
+    get_hub = monkey = None
+
+# Argon2id; these costs take about 0.15 s of CPU per hash/verify
+_password_hasher = PasswordHasher(time_cost=3, memory_cost=65536, parallelism=1)
+
+def _verify_argon2(password_hash, password):
+    # Failures are returned, not raised, so the gevent thread pool does not log them
+    try:
+        return _password_hasher.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def _run_blocking(func, *args):
+    """Run CPU-bound hashing off the gevent hub when served by gevent workers"""
+    # The hashes release the GIL, so a hub thread keeps every other greenlet
+    # of the worker running meanwhile; elsewhere (dev server, Celery) call directly
+    if monkey is not None and monkey.is_module_patched('socket'):
+        return get_hub().threadpool.apply(func, args)
+    return func(*args)
 
 class User:
     """User model for handling user operations"""
@@ -13,10 +38,10 @@ class User:
         db = Database()
         
         # Check if user already exists
-        if cls.get_by_email(email) or cls.get_by_username(username):
+        if cls.email_exists(email) or cls.username_exists(username):
             return None
         
-        password_hash = generate_password_hash(password)
+        password_hash = cls.hash_password(password)
         
         query = '''
             INSERT INTO users (username, email, password_hash, first_name, last_name, phone, address, role)
@@ -33,6 +58,19 @@ class User:
         query = "SELECT * FROM users WHERE id = %s"
         return db.execute_query(query, (user_id,), fetch=True, fetchone=True)
     
+    @classmethod
+    def get_by_id_with_counts(cls, user_id):
+        """Get user by ID together with their order and product counts"""
+        db = Database()
+        query = '''
+            SELECT u.*,
+                   (SELECT COUNT(*) FROM orders WHERE user_id = u.id) AS orders_count,
+                   (SELECT COUNT(*) FROM products WHERE seller_id = u.id) AS products_count
+            FROM users u
+            WHERE u.id = %s
+        '''
+        return db.execute_query(query, (user_id,), fetch=True, fetchone=True)
+    
     @classmethod
     def get_by_email(cls, email):
         """Get user by email"""
@@ -47,11 +85,41 @@ class User:
         query = "SELECT * FROM users WHERE username = %s"
         return db.execute_query(query, (username,), fetch=True, fetchone=True)
     
+    @classmethod
+    def email_exists(cls, email):
+        """Whether an account uses this email (index-only lookup)"""
+        db = Database()
+        query = "SELECT 1 FROM users WHERE email = %s LIMIT 1"
+        return db.execute_query(query, (email,), fetch=True, fetchone=True) is not None
+    
+    @classmethod
+    def username_exists(cls, username):
+        """Whether an account uses this username (index-only lookup)"""
+        db = Database()
+        query = "SELECT 1 FROM users WHERE username = %s LIMIT 1"
+        return db.execute_query(query, (username,), fetch=True, fetchone=True) is not None
+    
+    @staticmethod
+    def hash_password(password):
+        """Hash a password with Argon2id"""
+        return _run_blocking(_password_hasher.hash, password)
+    
+    @staticmethod
+    def verify_password(password_hash, password):
+        """Check a password against a stored Argon2id or legacy Werkzeug hash"""
+        if password_hash.startswith('$argon2'):
+            return _run_blocking(_verify_argon2, password_hash, password)
+        return _run_blocking(check_password_hash, password_hash, password)
+    
     @classmethod
     def authenticate(cls, email, password):
         """Authenticate user by email and password"""
         user = cls.get_by_email(email)
-        if user and check_password_hash(user['password_hash'], password):
+        if user and cls.verify_password(user['password_hash'], password):
+            # Upgrade legacy hashes (and outdated Argon2 costs) on successful login
+            if (not user['password_hash'].startswith('$argon2') or
+                    _password_hasher.check_needs_rehash(user['password_hash'])):
+                cls.update_password(user['id'], password)
             return user
         return None
     
@@ -83,7 +151,7 @@ class User:
     def update_password(cls, user_id, new_password):
         """Update user password"""
         db = Database()
-        password_hash = generate_password_hash(new_password)
+        password_hash = cls.hash_password(new_password)
         query = "UPDATE users SET password_hash = %s WHERE id = %s"
         db.execute_query(query, (password_hash, user_id))
         return True
@@ -105,8 +173,18 @@ class User:
         return True
     
     @classmethod
-    def get_all_users(cls, role=None, status=None, limit=None, offset=0):
-        """Get all users with optional filters"""
+    def update_status_bulk(cls, user_ids, status):
+        """Update the status of several users at once; returns the number changed"""
+        if not user_ids:
+            return 0
+        db = Database()
+        placeholders = ', '.join(['%s'] * len(user_ids))
+        query = f"UPDATE users SET status = %s WHERE id IN ({placeholders})"
+        return db.execute_query(query, [status, *user_ids], rowcount=True)
+    
+    @classmethod
+    def get_all_users(cls, role=None, status=None, limit=None, offset=0, before_id=None):
+        """Get all users with optional filters, newest first"""
         db = Database()
         
         query = "SELECT * FROM users WHERE 1=1"
@@ -120,7 +198,12 @@ class User:
             query += " AND status = %s"
             params.append(status)
         
-        query += " ORDER BY created_at DESC"
+        # Keyset pagination: continue below the last id already shown
+        if before_id:
+            query += " AND id < %s"
+            params.append(before_id)
+        
+        query += " ORDER BY id DESC"
         
         if limit:
             query += " LIMIT %s OFFSET %s"
@@ -150,9 +233,25 @@ class User:
     @classmethod
     def delete(cls, user_id):
         """Delete a user (admin function)"""
+        from app.models.review import Review
+        
         db = Database()
         query = "DELETE FROM users WHERE id = %s"
-        db.execute_query(query, (user_id,))
+        with db.transaction():
+            reviewed = db.execute_query(
+                "SELECT DISTINCT product_id FROM reviews WHERE user_id = %s", (user_id,), fetch=True)
+            # The user's reviews go with the cascade; take them out of the products' rating totals
+            db.execute_query('''
+                UPDATE products p
+                JOIN (SELECT product_id, COUNT(*) AS review_count, SUM(rating) AS rating_sum
+                      FROM reviews WHERE user_id = %s GROUP BY product_id) r ON r.product_id = p.id
+                SET p.review_count = p.review_count - r.review_count,
+                    p.rating_sum = p.rating_sum - r.rating_sum,
+                    p.updated_at = p.updated_at
+            ''', (user_id,))
+            db.execute_query(query, (user_id,))
+        # Their cached review lists and ratings are stale now
+        Review._invalidate(*(row['product_id'] for row in reviewed))
         return True
     
     @classmethod
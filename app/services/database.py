@@ -1,7 +1,59 @@
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
+from mysql.connector.pooling import MySQLConnectionPool
+from flask import g, has_app_context
 from config.config import Config
+from collections import OrderedDict
+from contextlib import contextmanager
 import logging
+import threading
+import time
+import weakref
+
+# Connection pools shared by every Database instance, keyed by config
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Prepared statement cursors per physical connection: (server connection id, cursors keyed by SQL text)
+_statement_caches = weakref.WeakKeyDictionary()
+
+def _statement_cache(connection):
+    """Return the prepared cursors of a connection's current server session"""
+    # Pooled connections wrap the physical connection the statements live on
+    cnx = getattr(connection, '_cnx', connection)
+    connection_id = cnx.connection_id
+    entry = _statement_caches.get(cnx)
+    if entry is None or entry[0] != connection_id:
+        # New connection, or the pool reconnected it (e.g. after wait_timeout or a
+        # server restart) and the server forgot its statements: start afresh
+        entry = _statement_caches[cnx] = (connection_id, OrderedDict())
+    return entry[1]
+
+def _get_pool(config):
+    """Return the process-wide connection pool for a database config"""
+    key = tuple(sorted(config.items()))
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                # Session reset would deallocate the cached prepared statements;
+                # open transactions are rolled back on release instead
+                pool = MySQLConnectionPool(pool_name=f'pawfect{len(_pools)}',
+                                           pool_size=Config.DB_POOL_SIZE,
+                                           pool_reset_session=False,
+                                           **config)
+                _pools[key] = pool
+    return pool
+
+def _release(connection):
+    """End any open transaction and return a connection to the pool"""
+    try:
+        connection.rollback()
+    except Error:
+        pass
+    connection.close()
 
 class Database:
     """Database service class for MySQL operations"""
@@ -9,6 +61,7 @@ class Database:
     def __init__(self):
         self.config = Config.DATABASE
         self.connection = None
+        self._in_transaction = False
     
     def init_app(self, app):
         """No-op initializer to satisfy legacy app wiring"""
@@ -23,54 +76,161 @@ class Database:
                     'host': host,
                     'user': user,
                     'password': password,
-                    'database': database
+                    'database': database,
+                    'use_pure': app.config.get('MYSQL_USE_PURE', False)
                 }
         except Exception:
             pass
+        # Release the request's connection once the app context is torn down
+        app.teardown_appcontext(self.close_request_connection)
+    
+    @staticmethod
+    def close_request_connection(exception=None):
+        """Return the connection shared by the current app context to the pool"""
+        connection = g.pop('_db_connection', None)
+        if connection is not None:
+            _release(connection)
+    
+    def _checkout(self):
+        """Take a connection from the pool, or open one if the pool stays exhausted"""
+        pool = _get_pool(self.config)
+        deadline = time.monotonic() + Config.DB_POOL_TIMEOUT
+        while True:
+            try:
+                return pool.get_connection()
+            except PoolError:
+                # Under gevent many requests share a small pool; a connection is
+                # usually returned within milliseconds, which beats a new handshake
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.01)
+        logging.warning("Database connection pool exhausted, opening a new connection")
+        return mysql.connector.connect(**self.config)
     
     def connect(self):
         """Establish database connection"""
         try:
-            if self.connection is None or not self.connection.is_connected():
-                self.connection = mysql.connector.connect(**self.config)
-                return self.connection
+            if has_app_context():
+                # Every Database() used while handling a request shares one
+                # connection, released by close_request_connection()
+                connection = g.get('_db_connection')
+                if connection is None:
+                    connection = self._checkout()
+                    g._db_connection = connection
+                return connection
+            if self.connection is None:
+                self.connection = self._checkout()
             return self.connection
         except Error as e:
             logging.error(f"Database connection error: {e}")
             raise e
     
     def disconnect(self):
-        """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        """Close database connection (pooled connections go back to the pool)"""
+        if self.connection is not None:
+            _release(self.connection)
+            self.connection = None
+    
+    def _prepared_cursor(self, connection, query):
+        """Return (sql, cursor) with query prepared once per connection"""
+        cache = _statement_cache(connection)
+        entry = cache.get(query)
+        if entry is not None:
+            cache.move_to_end(query)
+            return entry
+        if len(cache) >= Config.DB_STATEMENT_CACHE_SIZE:
+            _, (_, stale_cursor) = cache.popitem(last=False)
+            stale_cursor.close()
+        # The cursor only skips re-preparing when handed the same string object,
+        # so the first instance of the SQL text is kept alongside it
+        entry = cache[query] = (query, connection.cursor(prepared=True, dictionary=True))
+        return entry
+    
+    def _discard_prepared(self, connection, query):
+        """Drop a cached statement after an error so it is prepared afresh"""
+        entry = _statement_cache(connection).pop(query, None)
+        if entry is not None:
+            try:
+                entry[1].close()
+            except Error:
+                pass
+    
+    @contextmanager
+    def transaction(self):
+        """Run several execute_query() writes as one transaction, rolled back on error"""
+        connection = self.connect()
+        self._in_transaction = True
+        try:
+            yield self
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            self._in_transaction = False
     
-    def execute_query(self, query, params=None, fetch=False, fetchone=False):
+    def execute_query(self, query, params=None, fetch=False, fetchone=False, rowcount=False):
         """Execute a SQL query"""
+        connection = None
         try:
             connection = self.connect()
-            cursor = connection.cursor(dictionary=True)
+            # Server-side prepared statement, parsed once and reused by later calls
+            sql, cursor = self._prepared_cursor(connection, query)
             
-            cursor.execute(query, params or ())
+            cursor.execute(sql, params or ())
             
             if fetch:
+                # Always drain the result so the cached cursor can be reused
+                rows = cursor.fetchall()
                 if fetchone:
-                    result = cursor.fetchone()
-                else:
-                    result = cursor.fetchall()
-                cursor.close()
-                return result
+                    return rows[0] if rows else None
+                return rows
             else:
-                connection.commit()
-                last_id = cursor.lastrowid
-                cursor.close()
-                return last_id
+                # Inside transaction() the commit happens once, at the end
+                if not self._in_transaction:
+                    connection.commit()
+                # Writes return the new row id, or the affected row count if asked
+                return cursor.rowcount if rowcount else cursor.lastrowid
                 
         except Error as e:
             logging.error(f"Database query error: {e}")
             if connection:
+                self._discard_prepared(connection, query)
                 connection.rollback()
             raise e
     
+    def execute_many(self, query, rows):
+        """Run one write statement for many parameter rows; multi-row INSERTs go out as one statement"""
+        connection = None
+        try:
+            connection = self.connect()
+            # A plain cursor: prepared cursors would send the rows one by one
+            cursor = connection.cursor()
+            cursor.executemany(query, rows)
+            if not self._in_transaction:
+                connection.commit()
+            result = cursor.rowcount
+            cursor.close()
+            return result
+        except Error as e:
+            logging.error(f"Database query error: {e}")
+            if connection:
+                connection.rollback()
+            raise e
+    
+    def get_dashboard_counts(self):
+        """Get the admin dashboard counters in a single query"""
+        query = """
+            SELECT
+                (SELECT COUNT(*) FROM users) AS total_users,
+                (SELECT COUNT(*) FROM users WHERE role = 'seller') AS total_sellers,
+                (SELECT COUNT(*) FROM users WHERE role = 'user') AS total_customers,
+                (SELECT COUNT(*) FROM seller_requests WHERE status = 'pending') AS pending_requests,
+                (SELECT COUNT(*) FROM orders) AS total_orders,
+                (SELECT COUNT(*) FROM orders WHERE status = 'pending') AS pending_orders
+        """
+        return self.execute_query(query, fetch=True, fetchone=True)
+    
     def create_database(self):
         """Create the database if it doesn't exist"""
         try:
@@ -153,10 +313,20 @@ class Database:
             stock_quantity INT DEFAULT 0,
             image_url VARCHAR(255),
             status ENUM('active', 'inactive', 'out_of_stock') DEFAULT 'active',
+            review_count INT NOT NULL DEFAULT 0,
+            rating_sum INT NOT NULL DEFAULT 0,
+            avg_rating DECIMAL(3,2) AS (IF(review_count = 0, 0, rating_sum / review_count)) STORED,
+            order_count_30d INT NOT NULL DEFAULT 0,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
             FOREIGN KEY (seller_id) REFERENCES users(id) ON DELETE CASCADE,
-            FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE RESTRICT
+            FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE RESTRICT,
+            INDEX idx_category_status_price (category_id, status, price),
+            INDEX idx_category_status_name (category_id, status, name),
+            INDEX idx_status_price (status, price),
+            INDEX idx_status_rating (status, avg_rating),
+            INDEX idx_status_orders (status, order_count_30d),
+            FULLTEXT idx_search (name, description)
         )
         '''
         
@@ -221,6 +391,49 @@ class Database:
         )
         '''
         
+        # Password reset tokens (hashed)
+        password_resets_table = '''
+        CREATE TABLE IF NOT EXISTS password_resets (
+            token_hash CHAR(32) PRIMARY KEY,
+            user_id INT NOT NULL,
+            expires_at DATETIME NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+            INDEX idx_user (user_id)
+        )
+        '''
+        
+        # Analytics rollup tables (filled by Analytics.refresh())
+        analytics_tables = [
+            '''
+            CREATE TABLE IF NOT EXISTS analytics_daily_sales (
+                sale_date DATE PRIMARY KEY,
+                order_count INT NOT NULL DEFAULT 0,
+                total_sales DECIMAL(12,2) NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS analytics_category_sales (
+                category_id INT PRIMARY KEY,
+                name VARCHAR(100) NOT NULL,
+                items_sold INT NOT NULL DEFAULT 0,
+                revenue DECIMAL(12,2) NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                INDEX idx_items_sold (items_sold)
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS analytics_seller_totals (
+                seller_id INT PRIMARY KEY,
+                total_orders INT NOT NULL DEFAULT 0,
+                total_revenue DECIMAL(12,2) NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                INDEX idx_total_revenue (total_revenue)
+            )
+            '''
+        ]
+        
         tables = [
             users_table,
             seller_requests_table, 
@@ -229,7 +442,9 @@ class Database:
             cart_table,
             orders_table,
             order_items_table,
-            reviews_table
+            reviews_table,
+            password_resets_table,
+            *analytics_tables
         ]
         
         for table in tables:
@@ -241,6 +456,73 @@ class Database:
         # Create default admin user
         self.create_default_admin()
     
+    def _column_exists(self, table, column):
+        query = """
+            SELECT 1 FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """
+        return self.execute_query(query, (table, column), fetch=True, fetchone=True) is not None
+    
+    def _add_missing_columns(self, table, columns):
+        """Add the (name, definition) columns the table lacks; returns the names added"""
+        missing = [(name, definition) for name, definition in columns
+                   if not self._column_exists(table, name)]
+        if missing:
+            self.execute_query(f"ALTER TABLE {table} " + ', '.join(
+                f"ADD COLUMN {name} {definition}" for name, definition in missing))
+        return [name for name, _ in missing]
+    
+    def _add_missing_indexes(self, table, indexes):
+        """Add the (name, columns) indexes the table lacks; returns the names added"""
+        query = """
+            SELECT 1 FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+            LIMIT 1
+        """
+        missing = [(name, columns) for name, columns in indexes
+                   if self.execute_query(query, (table, name), fetch=True, fetchone=True) is None]
+        if missing:
+            self.execute_query(f"ALTER TABLE {table} " + ', '.join(
+                f"ADD INDEX {name} ({columns})" for name, columns in missing))
+        return [name for name, _ in missing]
+    
+    def upgrade_schema(self):
+        """Bring a database created by an older version up to date (safe to run repeatedly)"""
+        applied = []
+        
+        # Stored rating totals, maintained by the Review model
+        added = self._add_missing_columns('products', [
+            ('review_count', 'INT NOT NULL DEFAULT 0'),
+            ('rating_sum', 'INT NOT NULL DEFAULT 0'),
+        ])
+        if added:
+            self.execute_query('''
+                UPDATE products p
+                JOIN (SELECT product_id, COUNT(*) AS review_count, SUM(rating) AS rating_sum
+                      FROM reviews GROUP BY product_id) r ON r.product_id = p.id
+                SET p.review_count = r.review_count, p.rating_sum = r.rating_sum
+            ''')
+            applied += [f'products.{name}' for name in added]
+        
+        # Search sort keys; order_count_30d is filled by `flask refresh-analytics`
+        added = self._add_missing_columns('products', [
+            ('avg_rating', 'DECIMAL(3,2) AS (IF(review_count = 0, 0, rating_sum / review_count)) STORED'),
+            ('order_count_30d', 'INT NOT NULL DEFAULT 0'),
+        ])
+        applied += [f'products.{name}' for name in added]
+        
+        # Listing and search indexes (filter on status/category, sort by the last column)
+        added = self._add_missing_indexes('products', [
+            ('idx_category_status_price', 'category_id, status, price'),
+            ('idx_category_status_name', 'category_id, status, name'),
+            ('idx_status_price', 'status, price'),
+            ('idx_status_rating', 'status, avg_rating'),
+            ('idx_status_orders', 'status, order_count_30d'),
+        ])
+        applied += [f'products.{name}' for name in added]
+        
+        return applied
+    
     def insert_default_categories(self):
         """Insert default pet supply categories"""
         categories = [
@@ -262,7 +544,7 @@ class Database:
     
     def create_default_admin(self):
         """Create default admin user"""
-        from werkzeug.security import generate_password_hash
+        from app.models.user import User
         
         admin_email = 'admin@pawfectfinds.com'
         check_query = "SELECT id FROM users WHERE email = %s"
@@ -272,7 +554,7 @@ class Database:
             admin_data = {
                 'username': 'admin',
                 'email': admin_email,
-                'password_hash': generate_password_hash('admin123'),
+                'password_hash': User.hash_password('admin123'),
                 'first_name': 'Admin',
                 'last_name': 'User',
                 'phone': '1234567890',
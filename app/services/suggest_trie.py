@@ -0,0 +1,114 @@
+from app import cache
+from app.services.database import Database
+from functools import lru_cache
+import json
+import re
+import threading
+import time
+
+# Every process keeps its own tries; bumping the shared version makes each one rebuild
+SUGGESTIONS_VERSION_KEY = 'suggestions:version'
+# Rebuild at least this often anyway, so order counts (the weights) stay current
+SUGGESTIONS_MAX_AGE = 300
+# Longer queries are matched on their first characters only
+MAX_PREFIX_LENGTH = 40
+
+_index = None
+_index_lock = threading.Lock()
+# Set while one request rebuilds a stale index; the others keep using the old one
+_building = False
+
+def _normalize(text):
+    return ' '.join(text.lower().split())
+
+class SuggestTrie:
+    """Prefix trie of names; every node keeps its best entries, so a lookup is one walk"""
+
+    def __init__(self, top_k):
+        self.top_k = top_k
+        self.root = {}
+
+    def build(self, entries):
+        """Index (name, payload) pairs, which must come best first"""
+        for name, payload in entries:
+            text = _normalize(name)
+            seen = set()
+            # Every word start is indexed, so "food" finds "Dog Food" as well
+            for match in re.finditer(r'\w+', text):
+                node = self.root
+                for char in text[match.start():match.start() + MAX_PREFIX_LENGTH]:
+                    node = node.setdefault(char, {})
+                    top = node.setdefault('', [])
+                    if id(top) not in seen and len(top) < self.top_k:
+                        seen.add(id(top))
+                        top.append(payload)
+        return self
+
+    def lookup(self, prefix):
+        """Best entries whose name has a word starting with prefix"""
+        node = self.root
+        for char in _normalize(prefix)[:MAX_PREFIX_LENGTH]:
+            node = node.get(char)
+            if node is None:
+                return []
+        return node.get('', [])
+
+class _SuggestionIndex:
+    def __init__(self, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        db = Database()
+        # Best sellers first, so each trie node keeps the most ordered products
+        products = db.execute_query('''
+            SELECT id, name, image_url, price
+            FROM products
+            WHERE status = 'active'
+            ORDER BY order_count_30d DESC, name
+        ''', fetch=True)
+        categories = db.execute_query(
+            "SELECT id, name FROM categories WHERE is_active = 1 ORDER BY name",
+            fetch=True
+        )
+        self.products = SuggestTrie(8).build(
+            (p['name'], {'name': p['name'], 'id': p['id'], 'image_url': p['image_url'], 'price': p['price']})
+            for p in products
+        )
+        self.categories = SuggestTrie(3).build((c['name'], c) for c in categories)
+        # Users retype and backspace over the same prefixes, so serialized answers
+        # are kept for as long as this index lives
+        self.lookup_json = lru_cache(maxsize=4096)(self._lookup_json)
+
+    def _lookup_json(self, prefix):
+        return json.dumps({
+            'products': self.products.lookup(prefix),
+            'categories': self.categories.lookup(prefix)
+        }, default=str)
+
+    def is_current(self, version):
+        return self.version == version and time.monotonic() - self.built_at < SUGGESTIONS_MAX_AGE
+
+def get_suggestions_json(query):
+    """Product and category suggestions for a search box prefix, as a JSON string"""
+    global _index, _building
+    version = cache.get(SUGGESTIONS_VERSION_KEY)
+    index = _index
+    if index is None:
+        # Nothing to serve yet: the first lookup builds while the others wait for it
+        with _index_lock:
+            if _index is None:
+                _index = _SuggestionIndex(version)
+            index = _index
+    elif not index.is_current(version):
+        with _index_lock:
+            rebuild = not _building
+            _building = True
+        if rebuild:
+            try:
+                index = _index = _SuggestionIndex(version)
+            finally:
+                _building = False
+    return index.lookup_json(query)
+
+def invalidate_suggestions():
+    """Make every process rebuild its suggestion tries on the next lookup"""
+    cache.set(SUGGESTIONS_VERSION_KEY, time.time_ns(), timeout=0)
@@ -0,0 +1,26 @@
+import logging
+
+from celery import shared_task
+from flask import current_app
+from flask_mail import Message
+
+from app import mail
+
+
+@shared_task(queue='mail', ignore_result=True)
+def send_contact_mail_task(form):
+    """Forward a contact form message to the contact inbox (runs on the `mail` worker queue)"""
+    recipient = current_app.config.get('CONTACT_EMAIL')
+    if not recipient:
+        logging.error(f"CONTACT_EMAIL is not set; dropping contact form from {form['email']}")
+        return
+    name = f"{form['first_name']} {form['last_name']}"
+    msg = Message(f"[Contact] {form['subject']}",
+                  recipients=[recipient],
+                  reply_to=form['email'])
+    msg.body = (f"From: {name} <{form['email']}>\n"
+                f"Phone: {form.get('phone') or '-'}\n"
+                f"Newsletter signup: {'yes' if form.get('newsletter') else 'no'}\n\n"
+                f"{form['message']}\n")
+    mail.send(msg)
+    logging.info(f"Contact form from {form['email']} forwarded (subject: {form['subject']})")
@@ -0,0 +1,21 @@
+import logging
+
+from celery import shared_task
+from flask_mail import Message
+
+from app import mail
+from app.models.delivery import Delivery
+
+
+@shared_task(queue='mail', ignore_result=True)
+def send_delivery_status_mail_task(delivery_id, status):
+    """Tell the customer their delivery status changed (runs on the `mail` worker queue)"""
+    contact = Delivery.get_customer_contact(delivery_id)
+    if not contact or not contact['email']:
+        return
+    label = status.replace('_', ' ')
+    msg = Message(f"Your PawfectFinds order #{contact['order_id']} is {label}", recipients=[contact['email']])
+    msg.body = (f"Hello {contact['first_name']},\n\n"
+                f"The delivery of your order #{contact['order_id']} is now: {label}.\n")
+    mail.send(msg)
+    logging.info(f"Delivery {delivery_id} status '{status}' emailed to {contact['email']}")
@@ -0,0 +1,15 @@
+from celery import shared_task
+from flask import current_app
+from flask_mail import Message
+
+from app import mail
+
+
+@shared_task(queue='mail', ignore_result=True)
+def send_reset_password_mail_task(to, reset_url):
+    """Send the password reset link (runs on the `mail` worker queue)"""
+    msg = Message('Reset your PawfectFinds password', recipients=[to])
+    msg.body = f'Use the link below to reset your password. It expires in one hour.\n\n{reset_url}\n'
+    # Rendered straight from the Jinja env: the app's context processors need a request
+    msg.html = current_app.jinja_env.get_template('auth/reset_email.html').render(reset_url=reset_url)
+    mail.send(msg)
@@ -52,6 +52,12 @@ def rate_limit(max_requests=60, window=60):
         return decorated_function
     return decorator
 
+def get_current_user():
+    """The logged-in user's row, loaded at most once per request (g.current_user)"""
+    if 'current_user' not in g:
+        g.current_user = User.get_by_id(session['user_id']) if 'user_id' in session else None
+    return g.current_user
+
 def validate_session():
     """Validate session integrity"""
     if 'user_id' not in session:
@@ -65,7 +71,7 @@ def validate_session():
             return False
     
     # Validate user still exists and is active
-    user = User.get_by_id(session['user_id'])
+    user = get_current_user()
     if not user or user['status'] != 'active':
         session.clear()
         return False
@@ -105,7 +111,7 @@ def role_required(required_role):
                 flash('Please log in to access this page.', 'warning')
                 return redirect(url_for('auth.login', next=request.url))
             
-            user = User.get_by_id(session['user_id'])
+            user = get_current_user()
             if not user or user['role'] != required_role:
                 flash('You do not have permission to access this page.', 'danger')
                 return redirect(url_for('public.landing'))
@@ -131,7 +137,7 @@ def anonymous_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' in session:
-            user = User.get_by_id(session['user_id'])
+            user = get_current_user()
             if user:
                 if user['role'] == 'admin':
                     return redirect(url_for('admin.dashboard'))
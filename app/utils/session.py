@@ -0,0 +1,75 @@
+import logging
+from flask import current_app, session
+from flask.sessions import SessionInterface
+from redis.exceptions import RedisError
+
+
+class StaticRequestFilteringSessionInterface(SessionInterface):
+    """Session interface wrapper that skips session handling for static files
+
+    Static assets never read the session, so opening (and re-saving) one for
+    every image/CSS request is wasted work. Those requests get a null
+    session, which Flask never saves; everything else is delegated to the
+    wrapped interface.
+    """
+
+    def __init__(self, interface, static_prefix):
+        self.interface = interface
+        self.static_prefix = static_prefix
+
+    def open_session(self, app, request):
+        if request.path.startswith(self.static_prefix):
+            # Returning None makes Flask fall back to make_null_session()
+            return None
+        return self.interface.open_session(app, request)
+
+    def save_session(self, app, session, response):
+        return self.interface.save_session(app, session, response)
+
+    def __getattr__(self, name):
+        # Expose extras of the wrapped interface (e.g. Flask-Session helpers)
+        return getattr(self.interface, name)
+
+
+def _user_sessions_key(user_id):
+    return f'user:{user_id}:sessions'
+
+
+def track_user_session(user_id):
+    """Remember the current session id under the user, so it can be revoked"""
+    sid = getattr(session, 'sid', None)
+    if sid is None:
+        return
+    try:
+        redis_client = current_app.config['SESSION_REDIS']
+        key = _user_sessions_key(user_id)
+        pipe = redis_client.pipeline()
+        pipe.sadd(key, sid)
+        pipe.expire(key, current_app.permanent_session_lifetime)
+        pipe.execute()
+    except RedisError as e:
+        logging.warning(f"Could not track session for user {user_id}: {e}")
+
+
+def untrack_user_session(user_id):
+    """Forget the current session id (on logout)"""
+    sid = getattr(session, 'sid', None)
+    if sid is None:
+        return
+    try:
+        current_app.config['SESSION_REDIS'].srem(_user_sessions_key(user_id), sid)
+    except RedisError as e:
+        logging.warning(f"Could not untrack session for user {user_id}: {e}")
+
+
+def revoke_user_sessions(*user_ids):
+    """Delete every stored session of the given users, logging them out immediately"""
+    try:
+        redis_client = current_app.config['SESSION_REDIS']
+        prefix = current_app.config['SESSION_KEY_PREFIX']
+        for user_id in user_ids:
+            key = _user_sessions_key(user_id)
+            sids = redis_client.smembers(key)
+            redis_client.delete(key, *(prefix + sid.decode() for sid in sids))
+    except RedisError as e:
+        logging.warning(f"Could not revoke sessions for users {user_ids}: {e}")
@@ -11,23 +11,45 @@ class Config:
     MYSQL_USER = os.environ.get('MYSQL_USER') or 'root'
     MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD') or ''
     MYSQL_DB = os.environ.get('MYSQL_DB') or 'pawfect_findsdatabase'
+    # Pure-Python driver; required under gevent (set by wsgi.py)
+    MYSQL_USE_PURE = os.environ.get('MYSQL_USE_PURE', 'false').lower() in ['true', 'on', '1']
     
     # Mapping for app.services.database.Database
     DATABASE = {
         'host': MYSQL_HOST,
         'user': MYSQL_USER,
         'password': MYSQL_PASSWORD,
-        'database': MYSQL_DB
+        'database': MYSQL_DB,
+        'use_pure': MYSQL_USE_PURE
     }
     
+    # Connections kept open per process (mysql-connector allows up to 32)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 10)
+    
+    # Seconds to wait for a pooled connection before opening an extra one
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT') or 0.5)
+    
+    # Prepared statements kept per connection (least recently used are closed)
+    DB_STATEMENT_CACHE_SIZE = int(os.environ.get('DB_STATEMENT_CACHE_SIZE') or 64)
+    
     # SQLAlchemy configuration (unused in legacy path, kept for compatibility)
     SQLALCHEMY_DATABASE_URI = f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False  # Set to True for SQL debugging
     
+    # Redis (server-side sessions)
+    REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
+    
+    # Cache (Flask-Caching, shares the Redis server)
+    CACHE_TYPE = 'RedisCache'
+    CACHE_REDIS_URL = REDIS_URL
+    CACHE_KEY_PREFIX = 'cache:'
+    CACHE_DEFAULT_TIMEOUT = 300
+    
     # Session configuration
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
-    SESSION_TYPE = 'filesystem'
+    SESSION_TYPE = 'redis'
+    SESSION_KEY_PREFIX = 'session:'
     
     # File upload configuration
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
@@ -49,6 +71,22 @@ class Config:
     MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() in ['true', 'on', '1']
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or MAIL_USERNAME
+    
+    # Inbox that receives contact form messages
+    CONTACT_EMAIL = os.environ.get('CONTACT_EMAIL') or MAIL_DEFAULT_SENDER
+    
+    # Celery (background jobs such as email), brokered through Redis;
+    # run a worker with: celery -A make_celery worker -Q mail
+    CELERY = dict(
+        broker_url=os.environ.get('CELERY_BROKER_URL') or REDIS_URL,
+        task_ignore_result=True,
+        task_routes={
+            'app.tasks.mail_reset_password_task.send_reset_password_mail_task': {'queue': 'mail'},
+            'app.tasks.mail_contact_task.send_contact_mail_task': {'queue': 'mail'},
+            'app.tasks.mail_delivery_status_task.send_delivery_status_mail_task': {'queue': 'mail'},
+        },
+    )
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -62,6 +100,8 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    CACHE_TYPE = 'NullCache'
+    CELERY = dict(Config.CELERY, task_always_eager=True)
 
 config = {
     'development': DevelopmentConfig,
@@ -6,6 +6,7 @@ USE pawfect_findsdatabase;
 -- DROP TABLES (if you need to recreate)
 -- ====================================================
 -- Uncomment these if you need to reset the database
+-- DROP TABLE IF EXISTS password_resets;
 -- DROP TABLE IF EXISTS reviews;
 -- DROP TABLE IF EXISTS order_items;
 -- DROP TABLE IF EXISTS orders;
@@ -83,6 +84,10 @@ CREATE TABLE IF NOT EXISTS products (
     stock_quantity INT DEFAULT 0,
     image_url VARCHAR(255) NULL,
     status ENUM('active', 'inactive', 'out_of_stock') DEFAULT 'active',
+    review_count INT NOT NULL DEFAULT 0, -- maintained by the Review model
+    rating_sum INT NOT NULL DEFAULT 0,
+    avg_rating DECIMAL(3,2) AS (IF(review_count = 0, 0, rating_sum / review_count)) STORED,
+    order_count_30d INT NOT NULL DEFAULT 0, -- refreshed by `flask refresh-analytics`
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (seller_id) REFERENCES users(id) ON DELETE CASCADE,
@@ -92,6 +97,11 @@ CREATE TABLE IF NOT EXISTS products (
     INDEX idx_status (status),
     INDEX idx_name (name),
     INDEX idx_price (price),
+    INDEX idx_category_status_price (category_id, status, price),
+    INDEX idx_category_status_name (category_id, status, name),
+    INDEX idx_status_price (status, price),
+    INDEX idx_status_rating (status, avg_rating),
+    INDEX idx_status_orders (status, order_count_30d),
     FULLTEXT idx_search (name, description)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
@@ -189,6 +199,45 @@ CREATE TABLE IF NOT EXISTS reviews (
     INDEX idx_rating (rating)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- ====================================================
+-- PASSWORD RESETS TABLE (only token hashes are stored)
+-- ====================================================
+CREATE TABLE IF NOT EXISTS password_resets (
+    token_hash CHAR(32) PRIMARY KEY,
+    user_id INT NOT NULL,
+    expires_at DATETIME NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_user (user_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ====================================================
+-- ANALYTICS ROLLUP TABLES (refreshed by `flask refresh-analytics`)
+-- ====================================================
+CREATE TABLE IF NOT EXISTS analytics_daily_sales (
+    sale_date DATE PRIMARY KEY,
+    order_count INT NOT NULL DEFAULT 0,
+    total_sales DECIMAL(12,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS analytics_category_sales (
+    category_id INT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    items_sold INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(12,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_items_sold (items_sold)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS analytics_seller_totals (
+    seller_id INT PRIMARY KEY,
+    total_orders INT NOT NULL DEFAULT 0,
+    total_revenue DECIMAL(12,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_total_revenue (total_revenue)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- ====================================================
 -- INSERT DEFAULT DATA
 -- ====================================================
@@ -254,6 +303,14 @@ INSERT INTO reviews (user_id, product_id, rating, comment) VALUES
 (4, 7, 5, 'Perfect starter kit for my first aquarium. Everything I needed was included.'),
 (5, 9, 5, 'Beautiful cage and very spacious. My parrot loves it!');
 
+-- Stored rating totals for the sample reviews. On an existing database,
+-- `flask --app app migrate` adds and backfills these columns, the search stats
+-- (avg_rating, order_count_30d) and their indexes instead.
+UPDATE products p
+JOIN (SELECT product_id, COUNT(*) AS review_count, SUM(rating) AS rating_sum
+      FROM reviews GROUP BY product_id) r ON r.product_id = p.id
+SET p.review_count = r.review_count, p.rating_sum = r.rating_sum;
+
 -- Insert sample cart items (for testing)
 INSERT INTO cart (user_id, product_id, quantity) VALUES
 (4, 1, 1),
@@ -321,6 +378,24 @@ ORDER BY total_sold DESC;
 CREATE INDEX idx_orders_date ON orders(created_at);
 CREATE INDEX idx_products_price_range ON products(price, status);
 CREATE INDEX idx_reviews_product_rating ON reviews(product_id, rating);
+-- Covering indexes for the review analytics (top reviewers, monthly trend)
+CREATE INDEX idx_reviews_user_rating ON reviews(user_id, rating);
+CREATE INDEX idx_reviews_created_rating ON reviews(created_at, rating);
+
+-- Admin list filters. InnoDB appends the primary key to secondary indexes,
+-- so these also serve the keyset pages (ORDER BY id DESC, id < ?)
+CREATE INDEX idx_users_role_status ON users(role, status);
+CREATE INDEX idx_products_category_status ON products(category_id, status);
+
+-- Covers the per-product sales aggregate in the admin reports
+CREATE INDEX idx_order_items_product_sales ON order_items(product_id, quantity, price_at_time);
+
+-- Covers the payment method breakdown in the order analytics
+CREATE INDEX idx_orders_payment_method ON orders(payment_method, total_amount);
+
+-- Purchase check before a review: a user's delivered orders, then the product in each
+CREATE INDEX idx_orders_user_status ON orders(user_id, status);
+CREATE INDEX idx_order_items_order_product ON order_items(order_id, product_id);
 
 -- ====================================================
 -- PROCEDURES FOR COMMON OPERATIONS (OPTIONAL)
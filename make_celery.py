@@ -0,0 +1,7 @@
+"""Celery worker entry point: celery -A make_celery worker -Q mail"""
+import os
+
+from app import create_app
+
+flask_app = create_app(os.environ.get('FLASK_CONFIG') or 'default')
+celery_app = flask_app.extensions['celery']
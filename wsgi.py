@@ -0,0 +1,17 @@
+"""WSGI entry point for gunicorn's gevent workers:
+
+    gunicorn -k gevent -w $(nproc) --worker-connections 500 wsgi:app
+"""
+# Patch sockets, threads and time before anything else is imported, so DB
+# and Redis calls yield to other requests instead of blocking the worker
+from gevent import monkey
+monkey.patch_all()
+
+import os
+
+# The C extension of mysql-connector does blocking IO gevent cannot patch
+os.environ.setdefault('MYSQL_USE_PURE', '1')
+
+from app import create_app
+
+app = create_app(os.environ.get('FLASK_CONFIG') or 'production')